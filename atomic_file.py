@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+# Mode a plain open() would give a new file; temp files are created 0600 instead
+_umask = os.umask(0)
+os.umask(_umask)
+NEW_FILE_MODE = 0o666 & ~_umask
+
+def replace_file(tmp_path, path):
+    """Move tmp_path over path with the umask default mode, so files left 0600 get fixed too"""
+    os.chmod(tmp_path, NEW_FILE_MODE)
+    os.replace(tmp_path, path)
+
+def atomic_write(path, data):
+    """
+    Write data to path through a synced temp file swapped in with os.replace, so readers
+    and crashes never see a torn file. Returns the new file's stat.
+    """
+    directory, name = os.path.split(path)
+    tmp = tempfile.NamedTemporaryFile('wb', dir=directory or '.', prefix=f'.{name}.', suffix='.tmp', delete=False)
+    try:
+        with tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+            st = os.fstat(tmp.fileno())
+        replace_file(tmp.name, path)
+    except Exception:
+        os.unlink(tmp.name)
+        raise
+    return st
@@ -1,17 +1,79 @@
 import smtplib
 import os
+import mmap
+import base64
+from itertools import islice
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
+from email.mime.application import MIMEApplication
 from email import encoders
 from datetime import datetime
 
+def iter_batches(items, size):
+    """Iterate over successive lists of up to size items without slicing the whole input up front"""
+    it = iter(items)
+    return iter(lambda: list(islice(it, size)), [])
+
 class EmailSender:
     def __init__(self, smtp_server, smtp_port, sender_email, sender_password):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.sender_email = sender_email
         self.sender_password = sender_password
+        self._server = None
+    
+    def __enter__(self):
+        self.open()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def open(self):
+        """Open an authenticated SMTP session that is reused until close()"""
+        if self._server is None:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            try:
+                server.starttls()
+                server.login(self.sender_email, self.sender_password)
+            except Exception:
+                server.close()
+                raise
+            self._server = server
+        return self._server
+    
+    def close(self):
+        """Close the persistent SMTP session, if any"""
+        if self._server is not None:
+            server, self._server = self._server, None
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+    
+    def _get_server(self):
+        """Return a live session, reconnecting if the server dropped it"""
+        try:
+            self._server.noop()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+            self._server = None
+        return self.open()
+    
+    def _attachment_part(self, photo_path):
+        """Build a base64 attachment, encoding straight from a read-only mmap of the file"""
+        filename = os.path.basename(photo_path)
+        with open(photo_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    encoded = base64.encodebytes(data).decode('ascii')
+            else:
+                encoded = ''
+        
+        part = MIMEApplication(encoded, _encoder=encoders.encode_noop, name=filename)
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header('Content-Disposition', f'attachment; filename= {filename}')
+        return part
     
     def send_photos(self, recipient_email, photo_paths, subject=None):
         if not photo_paths:
@@ -42,27 +104,18 @@ class EmailSender:
         # Attach photos
         for photo_path in photo_paths:
             if os.path.exists(photo_path):
-                with open(photo_path, 'rb') as f:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(f.read())
-                    encoders.encode_base64(part)
-                    part.add_header(
-                        'Content-Disposition',
-                        f'attachment; filename= {os.path.basename(photo_path)}'
-                    )
-                    msg.attach(part)
+                msg.attach(self._attachment_part(photo_path))
             else:
                 print(f"Warning: Photo not found: {photo_path}")
         
-        # Send email
+        # Send email, reusing the persistent session when one is open
         try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender_email, self.sender_password)
-            
             text = msg.as_string()
-            server.sendmail(self.sender_email, recipient_email, text)
-            server.quit()
+            if self._server is not None:
+                self._get_server().sendmail(self.sender_email, recipient_email, text)
+            else:
+                with self:
+                    self._server.sendmail(self.sender_email, recipient_email, text)
             
             print(f"Email sent successfully to {recipient_email}")
             return True
@@ -71,15 +124,34 @@ class EmailSender:
             print(f"Error sending email: {e}")
             return False
     
-    def send_photos_in_batches(self, recipient_email, photo_paths, batch_size=5):
-        """Send photos in batches to avoid large email sizes"""
-        batches = [photo_paths[i:i + batch_size] for i in range(0, len(photo_paths), batch_size)]
+    def send_photos_in_batches(self, recipient_email, photo_paths, batch_size=5, keep_open=False):
+        """Send photos in batches to avoid large email sizes; keep_open leaves the session up for reuse"""
+        # Nothing to send, so don't log in to SMTP (and risk failing) for zero batches
+        if not photo_paths:
+            return True
         
-        for i, batch in enumerate(batches):
-            subject = f"Photos batch {i+1}/{len(batches)} - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            success = self.send_photos(recipient_email, batch, subject)
-            if not success:
-                print(f"Failed to send batch {i+1}")
-                return False
+        total = -(-len(photo_paths) // batch_size)
+        failed = 0
+        
+        # One SMTP session serves every batch; a session the caller opened is left open
+        owns_session = self._server is None and not keep_open
+        try:
+            self.open()
+            for i, batch in enumerate(iter_batches(photo_paths, batch_size)):
+                subject = f"Photos batch {i+1}/{total} - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+                success = self.send_photos(recipient_email, batch, subject)
+                if not success:
+                    failed += 1
+                    print(f"Failed to send batch {i+1}")
+                    # Give up once more than a third of the batches have failed
+                    if failed * 3 > total:
+                        print("Too many failed batches, aborting")
+                        return False
+        except Exception as e:
+            print(f"Error sending email: {e}")
+            return False
+        finally:
+            if owns_session:
+                self.close()
         
-        return True
\ No newline at end of file
+        return failed == 0
\ No newline at end of file
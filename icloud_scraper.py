@@ -1,67 +1,254 @@
 import time
 import os
-import json
-import hashlib
+import re
+import orjson
+import shutil
+import socket
+import subprocess
+import sqlite3
+import functools
+import xxhash
+from rbloom import Bloom
+import threading
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException
 import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
 from datetime import datetime
+from tqdm import tqdm
 from dotenv import load_dotenv
 from selenium.webdriver.chrome.service import Service
+from atomic_file import atomic_write, replace_file
+
+# Video detection, compiled once instead of scanning extension lists per URL
+VIDEO_EXT_RE = re.compile(r'\.(?:mp4|mov|avi|wmv|flv|webm|mkv)(?:[?#]|$)', re.IGNORECASE)
+VIDEO_CONTENT_TYPES = ('video/', 'mp4', 'mov', 'avi', 'wmv', 'flv', 'webm')
+
+class ReattachedDriver(webdriver.Remote):
+    """Remote WebDriver bound to an existing session instead of creating a new one"""
+    def __init__(self, command_executor, session_id):
+        self._existing_session_id = session_id
+        super().__init__(command_executor=command_executor, options=Options())
+    
+    def start_session(self, capabilities):
+        self.session_id = self._existing_session_id
+        self.caps = {}
+
+# Returns [src of the main carousel photo, whether a next button was clicked]
+CAROUSEL_STEP_SCRIPT = """
+const image = document.querySelector("img[src*='icloud']");
+const next = document.querySelector("[aria-label='Next'], .next, [data-testid='next']");
+if (image && next) {
+    next.click();
+}
+return [image ? image.src : null, Boolean(image && next)];
+"""
+
+CURRENT_PHOTO_SCRIPT = """
+const image = document.querySelector("img[src*='icloud']");
+return image ? image.src : null;
+"""
+
+class PhotoRow:
+    """One row of the photos table; slotted so buffered rows carry no per-instance dict"""
+    __slots__ = ('photo_hash', 'filename', 'timestamp', 'url', 'emailed', 'hash_algo')
+    
+    def __init__(self, photo_hash, filename, timestamp=None, url=None, emailed=0, hash_algo=None):
+        self.photo_hash = photo_hash
+        self.filename = filename
+        self.timestamp = timestamp
+        self.url = url
+        self.emailed = emailed
+        self.hash_algo = hash_algo
+    
+    @classmethod
+    def from_cursor(cls, cursor, row):
+        """sqlite3 row_factory building PhotoRows from full photos-table rows"""
+        return cls(*row)
+    
+    def astuple(self):
+        return (self.photo_hash, self.filename, self.timestamp, self.url, self.emailed, self.hash_algo)
 
 class ICloudPhotoScraper:
-    def __init__(self, album_url, download_dir=None, data_dir='data'):
+    # Concurrent downloads against the iCloud CDN
+    DOWNLOAD_WORKERS = 16
+    # Buffered URL/photo records are written to the database this many at a time
+    WRITE_BATCH_SIZE = 100
+    # Anything larger than this is not a photo and is skipped like a video
+    MAX_PHOTO_BYTES = 100 * 1024 * 1024
+    # Photo fingerprint; older MD5-keyed photos are re-keyed at startup, or tagged 'md5' if their file is gone
+    PHOTO_HASH_ALGO = 'xxh3_128'
+    
+    def __init__(self, album_url, download_dir=None, data_dir='data', persist_driver=True):
         self.album_url = album_url
+        # Keep Chrome running between runs and reattach to it instead of cold-starting
+        self.persist_driver = persist_driver
         self.download_dir = download_dir or os.path.expanduser('~/Pictures/Skylight')
         self.data_dir = data_dir
         self.processed_photos_file = os.path.join(data_dir, 'processed_photos.json')
         self.processed_urls_file = os.path.join(data_dir, 'processed_urls.json')
+        self.db_file = os.path.join(data_dir, 'skylight.db')
+        self.driver_state_file = os.path.join(data_dir, 'driver.json')
+        self._driver_is_persistent = False
+        self._state_lock = threading.Lock()
+        # Rows buffered for the next batched insert, keyed by primary key
+        self._pending_photos = {}
+        self._pending_urls = {}
+        # Bloom filter over processed normalized URLs, built on first use
+        self._url_bloom = None
         
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
         if not os.path.exists(self.download_dir):
             os.makedirs(self.download_dir)
-            
-        self.processed_photos = self.load_processed_photos()
-        self.processed_urls = self.load_processed_urls()
+        
+        self.db = self.open_database()
+        
+        # One-time import of the JSON files used before the SQLite database
+        self.load_processed_photos()
+        self.load_processed_urls()
+        
+        # One-time re-keying of photos recorded under their old MD5 fingerprint
+        self.migrate_legacy_hashes()
         
         # Migrate existing processed photos to URL database if needed
         self.migrate_existing_urls()
     
+    def open_database(self):
+        """Open the processed photos/URLs database in WAL mode, creating its tables if needed"""
+        db = sqlite3.connect(self.db_file, isolation_level=None, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS photos (
+                hash TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                timestamp TEXT,
+                url TEXT,
+                emailed INTEGER NOT NULL DEFAULT 0,
+                hash_algo TEXT
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                normalized TEXT PRIMARY KEY,
+                photo_hash TEXT,
+                url TEXT,
+                processed_at TEXT
+            );
+        """)
+        return db
+    
+    def _write_rows(self, sql, rows):
+        """Run an INSERT/UPDATE for many rows inside a single transaction"""
+        if not rows:
+            return
+        self.db.execute('BEGIN')
+        try:
+            self.db.executemany(sql, rows)
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+    
     def load_processed_photos(self):
-        if os.path.exists(self.processed_photos_file):
-            with open(self.processed_photos_file, 'r') as f:
-                return json.load(f)
-        return {}
+        """Import a legacy processed_photos.json into the database once, then delete it"""
+        if not os.path.exists(self.processed_photos_file):
+            return
+        with open(self.processed_photos_file, 'rb') as f:
+            photos = orjson.loads(f.read())
+        self._write_rows(
+            'INSERT OR IGNORE INTO photos (hash, filename, timestamp, url, emailed, hash_algo) VALUES (?, ?, ?, ?, ?, ?)',
+            [
+                (photo_hash, photo_data['filename'], photo_data.get('timestamp'), photo_data.get('url'),
+                 int(photo_data.get('emailed', False)), photo_data.get('hash_algo'))
+                for photo_hash, photo_data in photos.items()
+            ]
+        )
+        os.remove(self.processed_photos_file)
+        print(f"Imported {len(photos)} photos from {self.processed_photos_file} into {self.db_file}")
     
     def load_processed_urls(self):
-        """Load the processed URLs database"""
-        if os.path.exists(self.processed_urls_file):
-            with open(self.processed_urls_file, 'r') as f:
-                return json.load(f)
-        return {}
+        """Import a legacy processed_urls.json into the database once, then delete it"""
+        if not os.path.exists(self.processed_urls_file):
+            return
+        with open(self.processed_urls_file, 'rb') as f:
+            urls = orjson.loads(f.read())
+        self._write_rows(
+            'INSERT OR IGNORE INTO urls (normalized, photo_hash, url, processed_at) VALUES (?, ?, ?, ?)',
+            [
+                (normalized_url, url_data.get('photo_hash'), url_data.get('original_url'), url_data.get('processed_at'))
+                for normalized_url, url_data in urls.items()
+            ]
+        )
+        os.remove(self.processed_urls_file)
+        print(f"Imported {len(urls)} URLs from {self.processed_urls_file} into {self.db_file}")
     
     def save_processed_photos(self):
-        with open(self.processed_photos_file, 'w') as f:
-            json.dump(self.processed_photos, f, indent=2)
+        """Flush buffered photo records to the database"""
+        pending, self._pending_photos = self._pending_photos, {}
+        self._write_rows(
+            'INSERT OR REPLACE INTO photos (hash, filename, timestamp, url, emailed, hash_algo) VALUES (?, ?, ?, ?, ?, ?)',
+            [row.astuple() for row in pending.values()]
+        )
     
     def save_processed_urls(self):
-        """Save the processed URLs database"""
-        with open(self.processed_urls_file, 'w') as f:
-            json.dump(self.processed_urls, f, indent=2)
+        """Flush buffered processed-URL records to the database"""
+        pending, self._pending_urls = self._pending_urls, {}
+        self._write_rows(
+            'INSERT OR REPLACE INTO urls (normalized, photo_hash, url, processed_at) VALUES (?, ?, ?, ?)',
+            list(pending.values())
+        )
+    
+    def count_processed(self):
+        """Return (photo count, URL count) recorded in the database"""
+        photo_count = self.db.execute('SELECT COUNT(*) FROM photos').fetchone()[0]
+        url_count = self.db.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+        return photo_count + len(self._pending_photos), url_count + len(self._pending_urls)
+    
+    def load_photo_hashes(self):
+        """Return the set of fingerprints of every photo already downloaded"""
+        hashes = {row[0] for row in self.db.execute('SELECT hash FROM photos')}
+        hashes.update(self._pending_photos)
+        return hashes
+    
+    def record_photo(self, photo_hash, filename, timestamp, url):
+        """Buffer a newly downloaded photo; written in batches of WRITE_BATCH_SIZE"""
+        self._pending_photos[photo_hash] = PhotoRow(photo_hash, filename, timestamp, url, 0, self.PHOTO_HASH_ALGO)
+        if len(self._pending_photos) >= self.WRITE_BATCH_SIZE:
+            self.save_processed_photos()
     
-    def normalize_url(self, url):
+    def get_unemailed_photos(self):
+        """Return a PhotoRow for every photo that has not been emailed yet"""
+        self.save_processed_photos()
+        cursor = self.db.cursor()
+        cursor.row_factory = PhotoRow.from_cursor
+        return cursor.execute(
+            'SELECT hash, filename, timestamp, url, emailed, hash_algo FROM photos WHERE emailed = 0'
+        ).fetchall()
+    
+    def mark_all_photos_emailed(self):
+        """Mark every photo in the database as emailed"""
+        self.save_processed_photos()
+        self.db.execute('UPDATE photos SET emailed = 1 WHERE emailed = 0')
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=8192)
+    def normalize_url(url):
         """
         Normalize iCloud URL by extracting the core photo identifier
         iCloud URLs have this pattern: https://cvws.icloud-content.com/S/XXXXX/FILENAME.JPG?params
         We'll use the path part (S/XXXXX/FILENAME.JPG) as the identifier
+        Results are memoized since every URL is normalized more than once per scrape
         """
         try:
-            from urllib.parse import urlparse
             parsed = urlparse(url)
             # Extract the path which contains the stable photo identifier
             path = parsed.path
@@ -71,42 +258,205 @@ class ICloudPhotoScraper:
             # Fallback: use the original URL
             return url
     
-    def is_url_processed(self, url):
-        """Check if we've already processed this URL (or a variant of it)"""
-        normalized_url = self.normalize_url(url)
-        return normalized_url in self.processed_urls
+    def url_bloom(self):
+        """
+        Return a Bloom filter of every processed normalized URL. A miss means the URL is
+        definitely new, so only hits need to be confirmed against the database.
+        """
+        if self._url_bloom is None:
+            url_count = self.db.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+            bloom = Bloom(max(2 * url_count, 100000), 0.01)
+            bloom.update(row[0] for row in self.db.execute('SELECT normalized FROM urls'))
+            bloom.update(self._pending_urls)
+            self._url_bloom = bloom
+        return self._url_bloom
+    
+    def find_processed_urls(self, urls):
+        """Return the set of normalized forms of urls that were already processed, in a few batched queries"""
+        bloom = self.url_bloom()
+        # Only Bloom filter hits can have been processed
+        normalized_urls = [
+            normalized_url for normalized_url in {self.normalize_url(url) for url in urls}
+            if normalized_url in bloom
+        ]
+        known = {normalized_url for normalized_url in normalized_urls if normalized_url in self._pending_urls}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(normalized_urls), 500):
+            chunk = normalized_urls[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            known.update(
+                row[0] for row in self.db.execute(f'SELECT normalized FROM urls WHERE normalized IN ({placeholders})', chunk)
+            )
+        return known
     
     def mark_url_processed(self, url, photo_hash):
-        """Mark a URL as processed and link it to the photo hash"""
+        """Mark a URL as processed and link it to the photo hash; written in batches of WRITE_BATCH_SIZE"""
         normalized_url = self.normalize_url(url)
-        self.processed_urls[normalized_url] = {
-            'photo_hash': photo_hash,
-            'original_url': url,
-            'processed_at': datetime.now().isoformat()
-        }
+        self._pending_urls[normalized_url] = (normalized_url, photo_hash, url, datetime.now().isoformat())
+        if self._url_bloom is not None:
+            self._url_bloom.add(normalized_url)
+        if len(self._pending_urls) >= self.WRITE_BATCH_SIZE:
+            self.save_processed_urls()
     
     def migrate_existing_urls(self):
         """Migrate existing processed photos to URL database"""
-        if not self.processed_urls and self.processed_photos:
-            print("Migrating existing processed photos to URL database...")
-            migrated_count = 0
-            for photo_hash, photo_data in self.processed_photos.items():
-                if 'url' in photo_data:
-                    self.mark_url_processed(photo_data['url'], photo_hash)
-                    migrated_count += 1
-            
-            if migrated_count > 0:
-                print(f"Migrated {migrated_count} URLs to URL database")
+        if self.db.execute('SELECT 1 FROM urls LIMIT 1').fetchone() is None:
+            photos = self.db.execute('SELECT hash, url FROM photos WHERE url IS NOT NULL').fetchall()
+            if photos:
+                print("Migrating existing processed photos to URL database...")
+                for photo_hash, url in photos:
+                    self.mark_url_processed(url, photo_hash)
+                print(f"Migrated {len(photos)} URLs to URL database")
                 self.save_processed_urls()
     
-    def get_photo_hash(self, photo_data):
-        return hashlib.md5(photo_data).hexdigest()
+    def photo_hasher(self):
+        """Return a fresh hash object used to fingerprint photo contents"""
+        return xxhash.xxh3_128()
+    
+    def migrate_legacy_hashes(self):
+        """
+        Re-key photos recorded under their old MD5 fingerprint by re-hashing their files in
+        download_dir. Photos whose file is gone (or whose new fingerprint is already recorded)
+        can't be re-keyed; they are tagged 'md5' so they are not looked at again.
+        """
+        legacy = self.db.execute('SELECT hash, filename FROM photos WHERE hash_algo IS NULL').fetchall()
+        if not legacy:
+            return
+        
+        print(f"Re-hashing {len(legacy)} photos recorded with MD5...")
+        rekeyed = []
+        missing = 0
+        for md5_hash, filename in legacy:
+            try:
+                hasher = self.photo_hasher()
+                with open(os.path.join(self.download_dir, filename), 'rb') as f:
+                    for chunk in iter(lambda: f.read(64 * 1024), b''):
+                        hasher.update(chunk)
+            except OSError:
+                missing += 1
+                continue
+            rekeyed.append((hasher.hexdigest(), self.PHOTO_HASH_ALGO, md5_hash))
+        
+        self.db.execute('BEGIN')
+        try:
+            # OR IGNORE: a photo already recorded under its new fingerprint keeps that row
+            self.db.executemany('UPDATE OR IGNORE photos SET hash = ?, hash_algo = ? WHERE hash = ?', rekeyed)
+            self.db.executemany(
+                'UPDATE urls SET photo_hash = ? WHERE photo_hash = ?',
+                [(photo_hash, md5_hash) for photo_hash, _, md5_hash in rekeyed]
+            )
+            self.db.execute("UPDATE photos SET hash_algo = 'md5' WHERE hash_algo IS NULL")
+        except Exception:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+        print(f"Re-hashed {len(rekeyed)} photos; {missing} no longer on disk")
+    
+    def create_http_session(self):
+        """Create a requests session whose connection pool keeps downloads to the iCloud CDN alive"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=3)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def is_video(self, image_url, content_type=''):
+        """Whether a URL or its (lower-cased) content type points at a video rather than a photo"""
+        if any(video_type in content_type for video_type in VIDEO_CONTENT_TYPES):
+            return True
+        return VIDEO_EXT_RE.search(image_url) is not None
+    
+    def skip_video(self, image_url):
+        """Record a video URL as processed so it is never checked again"""
+        with self._state_lock:
+            self.mark_url_processed(image_url, None)
+        return 'video', None
+    
+    def download_photo(self, session, idx, image_url, seen_hashes, new_photos):
+        """
+        Download one URL and record it. Runs on a worker thread, so shared state is
+        only touched under self._state_lock. Returns (result, filepath) where result
+        is one of 'new', 'duplicate', 'video' or 'error'.
+        """
+        try:
+            # The URL extension is a free pre-filter
+            if self.is_video(image_url):
+                return self.skip_video(image_url)
+            
+            # A body-less HEAD tells us about videos before anything is downloaded
+            head = session.head(image_url, timeout=10, allow_redirects=True)
+            if head.status_code == 200:
+                content_length = int(head.headers.get('content-length') or 0)
+                if self.is_video(image_url, head.headers.get('content-type', '').lower()) or \
+                        content_length > self.MAX_PHOTO_BYTES:
+                    return self.skip_video(image_url)
+            
+            with session.get(image_url, timeout=30, stream=True) as response:
+                if response.status_code != 200:
+                    # Don't mark failed URLs as processed - we might want to retry them
+                    return 'error', None
+                
+                # Re-check the GET headers in case they disagree with HEAD
+                if self.is_video(image_url, response.headers.get('content-type', '').lower()):
+                    return self.skip_video(image_url)
+                
+                # Hash while streaming the body to a temp file next to its final location
+                hasher = self.photo_hasher()
+                tmp = tempfile.NamedTemporaryFile(dir=self.download_dir, prefix='.download_', suffix='.part', delete=False)
+                try:
+                    with tmp:
+                        for chunk in response.iter_content(chunk_size=64 * 1024):
+                            hasher.update(chunk)
+                            tmp.write(chunk)
+                except Exception:
+                    os.unlink(tmp.name)
+                    raise
+            
+            photo_hash = hasher.hexdigest()
+            
+            with self._state_lock:
+                # Always mark URL as processed, regardless of whether photo is new
+                self.mark_url_processed(image_url, photo_hash)
+                is_duplicate = photo_hash in seen_hashes
+                if not is_duplicate:
+                    seen_hashes.add(photo_hash)
+            
+            if is_duplicate:
+                os.unlink(tmp.name)
+                return 'duplicate', None
+            
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"photo_{timestamp}_{idx}.jpg"
+            filepath = os.path.join(self.download_dir, filename)
+            
+            # Move into place under the final name, with the mode open() would have given it
+            try:
+                replace_file(tmp.name, filepath)
+            except OSError:
+                os.unlink(tmp.name)
+                with self._state_lock:
+                    seen_hashes.discard(photo_hash)
+                raise
+            
+            with self._state_lock:
+                self.record_photo(photo_hash, filename, timestamp, image_url)
+                new_photos.append(filepath)
+            return 'new', filepath
+        except Exception:
+            # Don't mark failed URLs as processed - we might want to retry them
+            return 'error', None
     
     def setup_driver(self):
-        import tempfile
         import uuid
         import time
         
+        if self.persist_driver:
+            driver = self.reattach_driver()
+            if driver is not None:
+                print(f"Reusing running Chrome session {driver.session_id}")
+                driver.delete_all_cookies()
+                return driver
+        
         # Create a unique temporary directory for this Chrome instance
         temp_dir = tempfile.mkdtemp(prefix=f"chrome_data_{uuid.uuid4().hex[:8]}_{int(time.time())}_")
         
@@ -137,10 +487,120 @@ class ICloudPhotoScraper:
         
         # Create the WebDriver with unique user data directory
         # Use chromedriver from PATH (installed via brew)
-        driver = webdriver.Chrome(options=chrome_options)
+        chromedriver = shutil.which('chromedriver') if self.persist_driver else None
+        if chromedriver:
+            driver = self.start_persistent_driver(chromedriver, chrome_options)
+        else:
+            driver = webdriver.Chrome(options=chrome_options)
         
         return driver
     
+    def start_persistent_driver(self, chromedriver, chrome_options):
+        """
+        Start chromedriver detached from this process so that it, and the Chrome session
+        it drives, outlive the run. The session is saved to driver_state_file for reattaching.
+        """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        
+        process = subprocess.Popen(
+            [chromedriver, f'--port={port}'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        executor_url = f'http://127.0.0.1:{port}'
+        
+        try:
+            # Wait for chromedriver to accept connections
+            for _ in range(100):
+                try:
+                    requests.get(f'{executor_url}/status', timeout=1)
+                    break
+                except requests.ConnectionError:
+                    time.sleep(0.1)
+            driver = webdriver.Remote(command_executor=executor_url, options=chrome_options)
+        except Exception:
+            process.kill()
+            raise
+        
+        atomic_write(self.driver_state_file, orjson.dumps({
+            'executor_url': executor_url,
+            'session_id': driver.session_id,
+            'chromedriver_pid': process.pid,
+            'chrome_dir': self.temp_chrome_dir
+        }, option=orjson.OPT_INDENT_2))
+        self._driver_is_persistent = True
+        return driver
+    
+    def load_driver_state(self):
+        """Return the saved persistent Chrome session, or None"""
+        try:
+            with open(self.driver_state_file, 'rb') as f:
+                return orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return None
+    
+    def reattach_driver(self):
+        """Reconnect to the Chrome session left running by a previous run, or None if it is gone"""
+        state = self.load_driver_state()
+        if state is None:
+            return None
+        
+        try:
+            driver = ReattachedDriver(state['executor_url'], state['session_id'])
+            driver.title  # Raises if the session or chromedriver has died
+        except Exception:
+            print("Saved Chrome session is no longer alive, starting a new one")
+            self.stop_persistent_driver(state)
+            return None
+        
+        self.temp_chrome_dir = state['chrome_dir']
+        self._driver_is_persistent = True
+        return driver
+    
+    def stop_persistent_driver(self, state):
+        """Kill a saved chromedriver and remove its Chrome profile and state file"""
+        import psutil
+        try:
+            # Only kill the PID if it still belongs to chromedriver, not a recycled one
+            process = psutil.Process(state['chromedriver_pid'])
+            if 'chromedriver' in process.name().lower():
+                process.terminate()
+        except (psutil.Error, KeyError):
+            pass
+        shutil.rmtree(state.get('chrome_dir', ''), ignore_errors=True)
+        if os.path.exists(self.driver_state_file):
+            os.remove(self.driver_state_file)
+    
+    def release_driver(self, driver):
+        """Done with the driver for this run: leave a persistent session running, otherwise quit Chrome"""
+        if self._driver_is_persistent:
+            return
+        
+        driver.quit()
+        
+        # Clean up temporary Chrome directory
+        if hasattr(self, 'temp_chrome_dir') and os.path.exists(self.temp_chrome_dir):
+            try:
+                shutil.rmtree(self.temp_chrome_dir)
+                print(f"Cleaned up temporary Chrome directory: {self.temp_chrome_dir}")
+            except Exception as e:
+                print(f"Warning: Could not clean up temporary Chrome directory: {e}")
+    
+    def quit(self):
+        """Shut down the persistent Chrome session, if one is running"""
+        state = self.load_driver_state()
+        if state is None:
+            return
+        try:
+            ReattachedDriver(state['executor_url'], state['session_id']).quit()
+        except Exception:
+            pass
+        self.stop_persistent_driver(state)
+        self._driver_is_persistent = False
+    
     def wait_for_images_to_load(self, driver, timeout=10):
         """Wait for images to load after scrolling"""
         try:
@@ -150,13 +610,22 @@ class ICloudPhotoScraper:
         except TimeoutException:
             print("No images found after waiting")
     
+    def wait_for_carousel(self, driver, timeout=5):
+        """Wait for the carousel view to show its first photo"""
+        try:
+            WebDriverWait(driver, timeout).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "img[src*='icloud']"))
+            )
+        except TimeoutException:
+            print("Carousel photo did not appear after waiting")
+    
     def navigate_carousel_and_collect_images(self, driver):
         """Navigate through the photo carousel to collect all image URLs"""
         print("Starting carousel navigation to collect image URLs...")
         print("Note: 'New URL' means a URL not seen in this session, not necessarily a new photo")
         
-        # Wait for initial page load (reduced from 5s to 2s)
-        time.sleep(2)
+        # Wait for the album grid to render instead of a fixed delay
+        self.wait_for_images_to_load(driver)
         
         # First, try to click on the first photo to enter carousel view
         print("Looking for first photo to click...")
@@ -166,14 +635,14 @@ class ICloudPhotoScraper:
             if view_buttons:
                 print(f"Found {len(view_buttons)} view buttons, clicking first one...")
                 view_buttons[0].click()
-                time.sleep(1)  # Reduced from 3s to 1s
+                self.wait_for_carousel(driver)
             else:
                 # Fallback: try clicking on any clickable photo container
                 photo_containers = driver.find_elements(By.CSS_SELECTOR, ".x-stream-photo-grid-item-view, [class*='photo'], [class*='grid-item']")
                 if photo_containers:
                     print(f"Found {len(photo_containers)} photo containers, clicking first one...")
                     photo_containers[0].click()
-                    time.sleep(1)  # Reduced from 3s to 1s
+                    self.wait_for_carousel(driver)
                 else:
                     print("No clickable photo elements found")
                     return []
@@ -185,25 +654,40 @@ class ICloudPhotoScraper:
         photo_count = 0
         first_photo_url = None
         consecutive_duplicates = 0
+        consecutive_stalls = 0
+        # Reused for every step; polls until the carousel shows a different photo
+        wait = WebDriverWait(driver, 2, poll_frequency=0.05)
         
-        print("Navigating through photos... (progress will update in place)")
+        print("Navigating through photos...")
+        # tqdm throttles redraws, so the loop doesn't flush stdout on every photo
+        pbar = tqdm(desc="Navigating", unit="photo")
         
         # Navigate through the carousel
         while True:
                 
             try:
-                # Wait for the current photo to load (reduced from 2s to 0.25s)
-                time.sleep(0.25)
-                
-                # Find the current photo in carousel view
-                carousel_images = driver.find_elements(By.CSS_SELECTOR, "img[src*='icloud']")
-                if not carousel_images:
-                    print(f"\rNo images found in carousel view at photo {photo_count + 1}")
+                # Read the current photo URL and advance to the next one in a single
+                # WebDriver round-trip instead of one command per DOM query
+                image_url, advanced = driver.execute_script(CAROUSEL_STEP_SCRIPT)
+                if image_url is None:
+                    pbar.write(f"No images found in carousel view at photo {photo_count + 1}")
                     break
                 
-                # Get the current photo URL
-                current_image = carousel_images[0]  # Usually the main image is first
-                image_url = current_image.get_attribute('src')
+                if not advanced:
+                    # No next button: press the arrow key on the focused element
+                    ActionChains(driver).send_keys(Keys.ARROW_RIGHT).perform()
+                
+                # Move on as soon as the next photo is displayed; the script returns None while
+                # the next slide's <img> has no src yet, which doesn't count as a new photo
+                try:
+                    wait.until(lambda d: d.execute_script(CURRENT_PHOTO_SCRIPT) not in (None, '', image_url))
+                    consecutive_stalls = 0
+                except TimeoutException:
+                    consecutive_stalls += 1
+                    if consecutive_stalls >= 2:
+                        pbar.write("Carousel stopped advancing, assuming end of album. Stopping...")
+                        all_images.add(image_url)
+                        break
                 
                 if image_url and image_url not in all_images:
                     all_images.add(image_url)
@@ -217,43 +701,29 @@ class ICloudPhotoScraper:
                     
                     # If we've seen too many consecutive duplicates, we might be in a loop
                     if consecutive_duplicates > 10:
-                        print(f"\rToo many consecutive duplicate URLs, likely in a loop. Stopping...")
+                        pbar.write("Too many consecutive duplicate URLs, likely in a loop. Stopping...")
                         break
                 
                 # Check if we've looped back to the first photo
                 if first_photo_url and image_url == first_photo_url and photo_count > 0:
-                    print(f"\rReached first photo again (loop detected), stopping...")
+                    pbar.write("Reached first photo again (loop detected), stopping...")
                     break
                 
-                # Update progress in place
-                print(f"\rProgress: Photo {photo_count + 1} | Unique URLs: {len(all_images)} | Consecutive duplicates: {consecutive_duplicates}", end='', flush=True)
-                
-                # Try to navigate to the next photo (optimized)
-                try:
-                    # Look for next button or use arrow key
-                    next_button = driver.find_element(By.CSS_SELECTOR, "[aria-label='Next'], .next, [data-testid='next']")
-                    next_button.click()
-                    # Reduced wait after click
-                    time.sleep(0.1)
-                except:
-                    # Try using arrow key as fallback
-                    from selenium.webdriver.common.keys import Keys
-                    driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ARROW_RIGHT)
-                    # Reduced wait after arrow key
-                    time.sleep(0.1)
-                
                 photo_count += 1
+                pbar.set_postfix(unique=len(all_images), duplicates=consecutive_duplicates, refresh=False)
+                pbar.update()
                 
                 # Safety check to prevent infinite loops
                 if photo_count > 5000:  # Reasonable limit for most albums
-                    print(f"\rReached maximum photo limit (5000), stopping navigation...")
+                    pbar.write("Reached maximum photo limit (5000), stopping navigation...")
                     break
                 
             except Exception as e:
-                print(f"\rError navigating photo {photo_count + 1}: {e}")
+                pbar.write(f"Error navigating photo {photo_count + 1}: {e}")
                 break
+        pbar.close()
         
-        print(f"\nFinished carousel navigation. Navigated {photo_count} photos, found {len(all_images)} unique URLs")
+        print(f"Finished carousel navigation. Navigated {photo_count} photos, found {len(all_images)} unique URLs")
         return list(all_images)
     
     def scrape_photos(self):
@@ -293,17 +763,16 @@ class ICloudPhotoScraper:
                 return new_photos
             
             print(f"Found {len(image_urls)} unique URLs. Checking for new photos...")
-            print(f"Already processed {len(self.processed_photos)} photos and {len(self.processed_urls)} URLs in database")
+            photo_count, url_count = self.count_processed()
+            print(f"Already processed {photo_count} photos and {url_count} URLs in database")
             
-            # Pre-filter URLs we've already processed
-            unprocessed_urls = []
-            url_skipped_count = 0
-            
-            for url in image_urls:
-                if self.is_url_processed(url):
-                    url_skipped_count += 1
-                else:
-                    unprocessed_urls.append(url)
+            # Pre-filter URLs we've already processed. The Bloom filter is rebuilt for each
+            # scrape so a long-lived scraper also sees URLs recorded by other processes
+            self._url_bloom = None
+            known_urls = self.find_processed_urls(image_urls)
+            normalize_url = self.normalize_url
+            unprocessed_urls = [url for url in image_urls if normalize_url(url) not in known_urls]
+            url_skipped_count = len(image_urls) - len(unprocessed_urls)
             
             print(f"URL pre-filtering: {len(unprocessed_urls)} URLs need checking, {url_skipped_count} URLs already processed")
             
@@ -312,79 +781,28 @@ class ICloudPhotoScraper:
                 self.save_processed_urls()
                 return new_photos
             
-            # Download only unprocessed URLs
-            seen_hashes = set(self.processed_photos.keys())
-            new_photos_count = 0
-            skipped_count = 0
-            videos_skipped = 0
-            errors_count = 0
+            # Download only unprocessed URLs, several at a time over one pooled session
+            seen_hashes = self.load_photo_hashes()
+            counts = {'new': 0, 'duplicate': 0, 'video': 0, 'error': 0}
+            session = self.create_http_session()
             
-            print("Checking unprocessed URLs for new content... (progress will update in place)")
+            print("Checking unprocessed URLs for new content...")
             
-            for idx, image_url in enumerate(unprocessed_urls):
-                try:
-                    # Update progress in place
-                    print(f"\rProgress: {idx+1}/{len(unprocessed_urls)} | New: {new_photos_count} | Skipped: {skipped_count} | Videos: {videos_skipped} | Errors: {errors_count}", end='', flush=True)
-                    
-                    response = requests.get(image_url, timeout=30)
-                    if response.status_code == 200:
-                        content_type = response.headers.get('content-type', '').lower()
-                        
-                        # Skip videos
-                        if any(video_type in content_type for video_type in ['video/', 'mp4', 'mov', 'avi', 'wmv', 'flv', 'webm']):
-                            videos_skipped += 1
-                            # Still mark video URLs as processed to avoid checking them again
-                            self.mark_url_processed(image_url, None)
-                            continue
-                        if any(ext in image_url.lower() for ext in ['.mp4', '.mov', '.avi', '.wmv', '.flv', '.webm', '.mkv']):
-                            videos_skipped += 1
-                            # Still mark video URLs as processed to avoid checking them again
-                            self.mark_url_processed(image_url, None)
-                            continue
-                        
-                        photo_hash = self.get_photo_hash(response.content)
-                        
-                        # Always mark URL as processed, regardless of whether photo is new
-                        self.mark_url_processed(image_url, photo_hash)
-                        
-                        if photo_hash not in seen_hashes:
-                            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                            filename = f"photo_{timestamp}_{idx}.jpg"
-                            filepath = os.path.join(self.download_dir, filename)
-                            
-                            # Save to intended directory
-                            with open(filepath, 'wb') as f:
-                                f.write(response.content)
-                            
-                            # If file was saved to Downloads, move it
-                            downloads_dir = os.path.expanduser('~/Downloads')
-                            downloaded_file = os.path.join(downloads_dir, filename)
-                            if os.path.exists(downloaded_file):
-                                import shutil
-                                shutil.move(downloaded_file, filepath)
-                                print(f"\nMoved {downloaded_file} to {filepath}")
-                            
-                            self.processed_photos[photo_hash] = {
-                                'filename': filename,
-                                'timestamp': timestamp,
-                                'url': image_url,
-                                'emailed': False
-                            }
-                            new_photos.append(filepath)
-                            seen_hashes.add(photo_hash)
-                            new_photos_count += 1
-                            print(f"\n✓ NEW PHOTO: {filename}")
-                        else:
-                            skipped_count += 1
-                    else:
-                        errors_count += 1
-                        # Don't mark failed URLs as processed - we might want to retry them
-                except Exception as e:
-                    errors_count += 1
-                    # Don't mark failed URLs as processed - we might want to retry them
-                    continue
+            with ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS) as executor:
+                futures = [
+                    executor.submit(self.download_photo, session, idx, image_url, seen_hashes, new_photos)
+                    for idx, image_url in enumerate(unprocessed_urls)
+                ]
+                with tqdm(as_completed(futures), total=len(unprocessed_urls), desc="Downloading", unit="url") as pbar:
+                    for future in pbar:
+                        result, filepath = future.result()
+                        counts[result] += 1
+                        if result == 'new':
+                            pbar.write(f"✓ NEW PHOTO: {os.path.basename(filepath)}")
+                        pbar.set_postfix(new=counts['new'], skipped=counts['duplicate'], videos=counts['video'], errors=counts['error'], refresh=False)
+            session.close()
             
-            print(f"\nDownload phase complete: {new_photos_count} new photos, {skipped_count} already processed, {videos_skipped} videos skipped, {errors_count} errors")
+            print(f"Download phase complete: {counts['new']} new photos, {counts['duplicate']} already processed, {counts['video']} videos skipped, {counts['error']} errors")
             print(f"Total efficiency: {url_skipped_count} URLs skipped by pre-filtering, {len(unprocessed_urls)} URLs actually checked")
             
             self.save_processed_photos()
@@ -393,16 +811,7 @@ class ICloudPhotoScraper:
         except Exception as e:
             print(f"Error during scraping: {e}")
         finally:
-            driver.quit()
-            
-            # Clean up temporary Chrome directory
-            if hasattr(self, 'temp_chrome_dir') and os.path.exists(self.temp_chrome_dir):
-                import shutil
-                try:
-                    shutil.rmtree(self.temp_chrome_dir)
-                    print(f"Cleaned up temporary Chrome directory: {self.temp_chrome_dir}")
-                except Exception as e:
-                    print(f"Warning: Could not clean up temporary Chrome directory: {e}")
+            self.release_driver(driver)
             
             # Clean up lock file
             lock_file = os.path.join(self.data_dir, 'scraper.lock')
@@ -443,16 +852,19 @@ if __name__ == "__main__":
     if smtp_server and sender_email and sender_password and recipient_email:
         emailer = EmailSender(smtp_server, smtp_port, sender_email, sender_password)
         
-        # Get all photos that haven't been emailed yet
-        unemailed_photos = []
-        total_photos = len(scraper.processed_photos)
-        print(f"Checking {total_photos} photos in database for email status...")
-        for photo_hash, photo_data in scraper.processed_photos.items():
-            if not photo_data.get('emailed', False):
-                photo_path = os.path.join(scraper.download_dir, photo_data['filename'])
-                if os.path.exists(photo_path):
-                    unemailed_photos.append(photo_path)
-                    print(f"Found unemailed photo: {photo_data['filename']}")
+        # Get all photos that haven't been emailed yet, checking them against one
+        # directory listing rather than stat-ing each file
+        pending_photos = scraper.get_unemailed_photos()
+        print(f"Checking {len(pending_photos)} unemailed photos in database...")
+        with os.scandir(scraper.download_dir) as entries:
+            existing_files = {entry.name for entry in entries}
+        unemailed_photos = [
+            os.path.join(scraper.download_dir, photo.filename)
+            for photo in pending_photos
+            if photo.filename in existing_files
+        ]
+        for photo_path in unemailed_photos:
+            print(f"Found unemailed photo: {os.path.basename(photo_path)}")
         
         print(f"Found {len(unemailed_photos)} unemailed photos")
         if unemailed_photos:
@@ -460,10 +872,7 @@ if __name__ == "__main__":
             success = emailer.send_photos_in_batches(recipient_email, unemailed_photos, batch_size=5)
             if success:
                 # Mark all photos as emailed
-                for photo_hash in scraper.processed_photos:
-                    if not scraper.processed_photos[photo_hash].get('emailed', False):
-                        scraper.processed_photos[photo_hash]['emailed'] = True
-                scraper.save_processed_photos()
+                scraper.mark_all_photos_emailed()
                 print("All photos marked as emailed in database.")
             else:
                 print("Email sending failed, photos not marked as emailed.")
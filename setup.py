@@ -8,8 +8,14 @@ import os
 import sys
 import subprocess
 import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Keeps output from prerequisite checks running in parallel from interleaving
+print_lock = threading.Lock()
+
 def print_banner():
     print("=" * 60)
     print("           SkylightSync Setup")
@@ -38,35 +44,37 @@ def check_virtual_environment():
         print("  venv\\Scripts\\activate     # On Windows")
         return False
 
+# Where Chrome is installed on each platform
+CHROME_PATHS = {
+    "darwin": "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    "linux": "/usr/bin/google-chrome",
+    "win32": "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+}
+
 def check_chrome():
     """Check if Chrome is installed"""
-    chrome_paths = [
-        "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",  # macOS
-        "/usr/bin/google-chrome",  # Linux
-        "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",  # Windows
-    ]
-    
-    for path in chrome_paths:
-        if os.path.exists(path):
+    # Only probe the path for this platform, with a single access() call
+    path = CHROME_PATHS.get(sys.platform)
+    if path and os.access(path, os.F_OK):
+        with print_lock:
             print("✅ Chrome browser found")
-            return True
+        return True
     
-    print("⚠️  Chrome browser not found")
-    print("Please install Google Chrome from https://www.google.com/chrome/")
+    with print_lock:
+        print("⚠️  Chrome browser not found")
+        print("Please install Google Chrome from https://www.google.com/chrome/")
     return False
 
 def check_chromedriver():
     """Check if ChromeDriver is installed"""
-    try:
-        result = subprocess.run(['chromedriver', '--version'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
+    # A PATH lookup is enough; no need to spawn chromedriver just to see it exists
+    if shutil.which('chromedriver'):
+        with print_lock:
             print("✅ ChromeDriver found")
-            return True
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        pass
+        return True
     
-    print("⚠️  ChromeDriver not found")
+    with print_lock:
+        print("⚠️  ChromeDriver not found")
     return False
 
 def install_chromedriver():
@@ -101,16 +109,28 @@ def setup_env_file():
         return False
     
     print("\n📝 Creating .env file from template...")
-    shutil.copy(env_example, env_file)
+    shutil.copyfile(env_example, env_file)
     print("✅ .env file created")
     print("⚠️  Please edit .env file with your email credentials")
     return True
 
 def install_python_dependencies():
     """Install Python dependencies"""
+    # Skip pip when requirements.txt hasn't changed since the last install into this environment
+    deps_hash_file = Path("data") / ".deps_hash"
+    deps_hash = hashlib.blake2b(Path("requirements.txt").read_bytes() + sys.prefix.encode()).hexdigest()
+    try:
+        if deps_hash_file.read_text().strip() == deps_hash:
+            print("✅ Python dependencies already installed")
+            return True
+    except FileNotFoundError:
+        pass
+    
     print("\n📦 Installing Python dependencies...")
     try:
         subprocess.run([sys.executable, '-m', 'pip', 'install', '-r', 'requirements.txt'], check=True)
+        deps_hash_file.parent.mkdir(exist_ok=True)
+        deps_hash_file.write_text(deps_hash)
         print("✅ Python dependencies installed")
         return True
     except subprocess.CalledProcessError:
@@ -267,8 +287,13 @@ def setup_terminal():
     # Check prerequisites
     check_python_version()
     venv_ok = check_virtual_environment()
-    chrome_ok = check_chrome()
-    chromedriver_ok = check_chromedriver()
+    
+    # The browser and driver lookups are independent I/O, so run them side by side
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        chrome_check = executor.submit(check_chrome)
+        chromedriver_check = executor.submit(check_chromedriver)
+        chrome_ok = chrome_check.result()
+        chromedriver_ok = chromedriver_check.result()
     
     if not venv_ok:
         print("\n⚠️  Virtual environment recommended but not required")
@@ -1,27 +1,75 @@
 #!/usr/bin/env python3
 
 import os
-import time
 import threading
 import signal
+import socket
+import selectors
 import sys
+import time
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime, timedelta
+from pathlib import Path
 from dotenv import load_dotenv
 from icloud_scraper import ICloudPhotoScraper
 from email_sender import EmailSender
-import json
+from sync_lock import SyncLock, BACKGROUND, MANUAL
+from atomic_file import atomic_write
+import orjson
+
+logger = logging.getLogger('skylight_sync')
+
+def setup_logging():
+    """Route log records through a queue so the sync thread never waits on stdout"""
+    log_queue = queue.Queue()
+    logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[QueueHandler(log_queue)])
+    listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    listener.start()
+    return listener
 
 class BackgroundPhotoMonitor:
     def __init__(self):
         self.running = False
-        self.sync_thread = None
+        # Set by stop() once the monitor is shutting down
+        self._stop_event = threading.Event()
+        # Signals received; a second one means quit without waiting for a running sync
+        self._signal_count = 0
         self.last_sync = None
-        self.sync_interval = int(os.getenv('SYNC_INTERVAL_MINUTES', '1440')) * 60  # Default 24 hours (1440 minutes)
+        self.sync_interval_minutes = int(os.getenv('SYNC_INTERVAL_MINUTES', '1440'))  # Default 24 hours (1440 minutes)
+        self.sync_interval = self.sync_interval_minutes * 60
+        self._interval_str = self._format_interval(self.sync_interval_minutes)
         self.photos_directory = os.path.expanduser(os.getenv('PHOTOS_DIRECTORY', '~/Pictures/Skylight'))
         self.album_url = os.getenv('ICLOUD_ALBUM_URL')
+        # Email settings are read once rather than on every sync
+        self.smtp_config = (
+            os.getenv('SMTP_SERVER'),
+            int(os.getenv('SMTP_PORT', '587')),
+            os.getenv('SMTP_USERNAME'),
+            os.getenv('SMTP_PASSWORD')
+        )
+        self.to_email = os.getenv('TO_EMAIL')
+        # Created on first use and kept, with its SMTP session, until stop()
+        self._email_sender = None
+        # Kept across syncs along with its database connection and Chrome session
+        self._scraper = None
+        # Last status written and the (inode, mtime, size) of the file it produced; while the
+        # file is untouched by anyone else it is reused instead of re-read and parsed
+        self._last_status = None
+        self._last_status_stamp = None
+        # The sync thread and the main thread's shutdown both write status
+        self._status_lock = threading.Lock()
+        # Set by the sync thread once its sync has finished
+        self._sync_done = threading.Event()
+        
+        # Create data directory if it doesn't exist, and build the paths used in it once
+        self.data_dir = Path('data')
+        self.data_dir.mkdir(exist_ok=True)
+        self.status_path = self.data_dir / 'status.json'
         
-        # Create data directory if it doesn't exist
-        os.makedirs('data', exist_ok=True)
+        # OS lock held for the duration of each sync, shared with the web UI's manual syncs
+        self._sync_lock = SyncLock(self.data_dir / 'sync.lock')
         
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -39,21 +87,26 @@ class BackgroundPhotoMonitor:
             return f"{days} day{'s' if days != 1 else ''}"
     
     def _signal_handler(self, signum, frame):
-        """Handle shutdown signals gracefully"""
-        print(f"\nReceived signal {signum}, shutting down gracefully...")
-        self.stop()
-        sys.exit(0)
+        """Flag a shutdown; the main loop, never busy with a sync, notices it and cleans up"""
+        self._signal_count += 1
+        self._stop_event.set()
     
     def update_status(self, last_sync=None, last_error=None, photos_sent=None):
         """Update status file with sync information"""
-        status_file = os.path.join('data', 'status.json')
-        status = {}
-        if os.path.exists(status_file):
-            with open(status_file, 'r') as f:
-                try:
-                    status = json.load(f)
-                except Exception:
-                    status = {}
+        with self._status_lock:
+            self._update_status(last_sync, last_error, photos_sent)
+    
+    def _update_status(self, last_sync, last_error, photos_sent):
+        try:
+            st = os.stat(self.status_path)
+            if (st.st_ino, st.st_mtime_ns, st.st_size) == self._last_status_stamp:
+                status = dict(self._last_status)
+            else:
+                with open(self.status_path, 'rb') as f:
+                    status = orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            status = {}
+        previous = dict(status)
         
         if last_sync is not None:
             status['last_sync'] = last_sync
@@ -64,184 +117,241 @@ class BackgroundPhotoMonitor:
         
         # Add background process info
         status['background_active'] = self.running
-        status['sync_interval_minutes'] = self.sync_interval // 60
+        status['sync_interval_minutes'] = self.sync_interval_minutes
         if self.last_sync:
             status['next_sync'] = (self.last_sync + timedelta(seconds=self.sync_interval)).isoformat()
         
-        with open(status_file, 'w') as f:
-            json.dump(status, f, indent=2)
+        # Nothing changed, so leave the file alone
+        if status == previous:
+            return
+        
+        st = atomic_write(self.status_path, orjson.dumps(status, option=orjson.OPT_INDENT_2))
+        self._last_status = status
+        # Both writers swap in a new file with os.replace, so the inode tells apart a write by
+        # the web UI that lands in the same mtime tick with the same size
+        self._last_status_stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
     
     def run_sync_once(self):
         """Run a single sync operation with proper locking"""
         if not self.album_url:
             return False, "ICLOUD_ALBUM_URL not configured"
         
-        # Create a lock file to prevent conflicts with manual sync
-        lock_file = os.path.join('data', 'background_sync.lock')
-        manual_lock_file = os.path.join('data', 'scraper.lock')
-        
-        # Check if manual sync is running
-        if os.path.exists(manual_lock_file):
-            print("Manual sync is running, skipping background sync")
-            return False, "Manual sync in progress"
-        
-        # Check if another background sync is running
-        if os.path.exists(lock_file):
-            print("Another background sync is running, skipping")
+        # Take the OS lock; it is released automatically if this process dies mid-sync.
+        # If it is taken, the holder's kind says whether a manual sync is running
+        if not self._sync_lock.acquire(BACKGROUND):
+            if self._sync_lock.holder() == MANUAL:
+                logger.info("Manual sync is running, skipping background sync")
+                return False, "Manual sync in progress"
+            logger.info("Another background sync is running, skipping")
             return False, "Another background sync is running"
         
+        # One timestamp for the whole sync, so its log lines and status entry agree
+        started = datetime.now()
+        last_sync = started.isoformat()
+        
         try:
-            # Create lock file
-            with open(lock_file, 'w') as f:
-                f.write(f"background_sync_{os.getpid()}")
-            
-            last_sync = datetime.now().isoformat()
             photos_sent = 0
             last_error = None
             
-            print(f"[{datetime.now()}] Starting background sync with album URL: {self.album_url}")
+            logger.info("[%s] Starting background sync with album URL: %s", started, self.album_url)
             
-            # Initialize scraper
-            scraper = ICloudPhotoScraper(self.album_url, download_dir=self.photos_directory)
+            # Initialize the scraper on the first sync and reuse it afterwards
+            if self._scraper is None:
+                self._scraper = ICloudPhotoScraper(self.album_url, download_dir=self.photos_directory)
             
             # Scrape new photos
-            print("Starting photo scraping...")
-            new_photos = scraper.scrape_photos()
-            print(f"Photo scraping completed. Found {len(new_photos)} new photos")
+            logger.info("Starting photo scraping...")
+            new_photos = self._scraper.scrape_photos()
+            logger.info("Photo scraping completed. Found %d new photos", len(new_photos))
             
             if new_photos:
-                # Initialize email sender
-                email_sender = EmailSender(
-                    os.getenv('SMTP_SERVER'),
-                    int(os.getenv('SMTP_PORT', '587')),
-                    os.getenv('SMTP_USERNAME'),
-                    os.getenv('SMTP_PASSWORD')
-                )
+                # Reuse one email sender across syncs; keep_open leaves its session up for
+                # the next sync and send_photos reconnects it if it went stale
+                if self._email_sender is None:
+                    self._email_sender = EmailSender(*self.smtp_config)
                 
                 # Send photos via email
-                success = email_sender.send_photos_in_batches(
-                    os.getenv('TO_EMAIL'), 
+                success = self._email_sender.send_photos_in_batches(
+                    self.to_email, 
                     new_photos, 
-                    batch_size=5
+                    batch_size=5,
+                    keep_open=True
                 )
                 
                 if success:
                     photos_sent = len(new_photos)
-                    print(f"Successfully sent {photos_sent} photos")
+                    logger.info("Successfully sent %d photos", photos_sent)
                 else:
                     last_error = "Failed to send some or all photos"
-                    print(f"Error: {last_error}")
+                    logger.error("Error: %s", last_error)
             else:
-                print("No new photos found")
+                logger.info("No new photos found")
             
-            self.update_status(last_sync=last_sync, last_error=last_error, photos_sent=photos_sent)
+            # Advance last_sync first so the status written below carries the new next_sync
             self.last_sync = datetime.now()
+            self.update_status(last_sync=last_sync, last_error=last_error, photos_sent=photos_sent)
             return True, f"Background sync completed. Found {len(new_photos)} new photos, sent {photos_sent}"
             
         except Exception as e:
             error_msg = f"Background sync error: {str(e)}"
-            print(f"Error during background sync: {e}")
-            self.update_status(last_sync=datetime.now().isoformat(), last_error=error_msg, photos_sent=0)
+            logger.error("Error during background sync: %s", e)
+            self.update_status(last_sync=last_sync, last_error=error_msg, photos_sent=0)
             return False, error_msg
         finally:
-            # Clean up lock file
-            if os.path.exists(lock_file):
-                os.remove(lock_file)
+            self._sync_lock.release()
     
-    def _sync_worker(self):
-        """Background thread that runs the sync process"""
-        print(f"Background sync worker started. Checking every {self._format_interval(self.sync_interval // 60)}")
-        
-        while self.running:
+    def _run_sync(self, initial, notify_socket):
+        """Sync thread: run one sync, log how it went, then wake the main loop with a zero byte"""
+        try:
+            success, message = self.run_sync_once()
+            if initial:
+                logger.info("Initial sync: %s", message)
+            elif success:
+                logger.info("[%s] %s", datetime.now(), message)
+            else:
+                logger.warning("[%s] Sync failed: %s", datetime.now(), message)
+        except Exception as e:
+            logger.error("Error in sync worker: %s", e)
+        finally:
+            self._sync_done.set()
             try:
-                # Wait for the sync interval, checking every 30 seconds if we should stop
-                wait_time = 0
-                while wait_time < self.sync_interval and self.running:
-                    time.sleep(30)
-                    wait_time += 30
-                
-                if not self.running:
-                    break
-                
-                # Run sync if we're still running
-                if self.running:
-                    success, message = self.run_sync_once()
-                    if success:
-                        print(f"[{datetime.now()}] {message}")
-                    else:
-                        print(f"[{datetime.now()}] Sync failed: {message}")
-                
-            except Exception as e:
-                print(f"Error in sync worker: {e}")
-                time.sleep(60)  # Wait a minute before trying again
+                notify_socket.send(b'\0')
+            except OSError:
+                pass
+    
+    def _sync_worker(self, selector, wakeup_socket, notify_socket):
+        """
+        Scheduling loop run on the main thread. Syncs run on their own thread, so this one
+        is always free to react to a signal: a single select() waits for whichever comes
+        first, the next sync being due, a signal, or the running sync finishing.
+        Returns the sync thread if one is still running.
+        """
+        logger.info("Background sync worker started. Checking every %s", self._interval_str)
+        
+        # The initial sync runs straight away
+        logger.info("Running initial sync...")
+        initial = True
+        next_sync = time.monotonic()
+        sync_thread = None
+        while not self._stop_event.is_set():
+            # No timeout while a sync runs; it wakes us when it is done
+            timeout = None if sync_thread is not None else max(0, next_sync - time.monotonic())
+            if selector.select(timeout=timeout):
+                # Woken by a signal or a finished sync; drain the socket and re-check
+                wakeup_socket.recv(512)
+                if sync_thread is not None and self._sync_done.is_set():
+                    sync_thread = None
+                    next_sync = time.monotonic() + self.sync_interval
+                continue
+            
+            self._sync_done.clear()
+            sync_thread = threading.Thread(target=self._run_sync, args=(initial, notify_socket), name='sync', daemon=True)
+            sync_thread.start()
+            initial = False
+        return sync_thread
+    
+    def _wait_for_sync(self, selector, wakeup_socket):
+        """Wait for the running sync to finish; returns False if another signal cuts the wait short"""
+        while not self._sync_done.is_set():
+            if self._signal_count > 1:
+                return False
+            if selector.select(timeout=1):
+                wakeup_socket.recv(512)
+        return True
     
     def start(self):
         """Start the background monitoring process"""
         if self.running:
-            print("Background monitor is already running")
+            logger.info("Background monitor is already running")
             return
         
         if not self.album_url:
-            print("Error: ICLOUD_ALBUM_URL environment variable is required")
+            logger.error("Error: ICLOUD_ALBUM_URL environment variable is required")
             return
         
-        print("Starting SkylightSync Background Photo Monitor")
-        print("=" * 50)
-        print(f"Album URL: {self.album_url}")
-        print(f"Photos Directory: {self.photos_directory}")
-        print(f"Sync Interval: {self._format_interval(self.sync_interval // 60)}")
-        print(f"Web UI available at: http://localhost:5003")
-        print("=" * 50)
+        logger.info("Starting SkylightSync Background Photo Monitor")
+        logger.info("=" * 50)
+        logger.info("Album URL: %s", self.album_url)
+        logger.info("Photos Directory: %s", self.photos_directory)
+        logger.info("Sync Interval: %s", self._interval_str)
+        logger.info("Web UI available at: http://localhost:5003")
+        logger.info("=" * 50)
         
         self.running = True
+        self._stop_event.clear()
         self.last_sync = datetime.now()
         
         # Update status to show background is active
         self.update_status()
         
-        # Start the background sync thread
-        self.sync_thread = threading.Thread(target=self._sync_worker, daemon=True)
-        self.sync_thread.start()
-        
-        # Run initial sync
-        print("Running initial sync...")
-        success, message = self.run_sync_once()
-        print(f"Initial sync: {message}")
+        # Signals write a byte to this socket pair, so the sync loop's select() wakes as
+        # soon as one arrives. A socket rather than a pipe so this also works on Windows
+        wakeup_socket, signal_socket = socket.socketpair()
+        wakeup_socket.setblocking(False)
+        signal_socket.setblocking(False)
+        signal.set_wakeup_fd(signal_socket.fileno())
+        selector = selectors.DefaultSelector()
+        selector.register(wakeup_socket, selectors.EVENT_READ)
         
-        # Keep the main thread alive
+        # Status is written by the syncs themselves, so there is no heartbeat to keep up
         try:
-            while self.running:
-                time.sleep(60)  # Check every minute
-                # Update status to show we're still active
-                self.update_status()
-        except KeyboardInterrupt:
-            print("\nShutdown requested...")
+            sync_thread = self._sync_worker(selector, wakeup_socket, signal_socket)
+            
+            logger.info("\nShutdown requested, shutting down gracefully...")
+            # Mark the monitor inactive before waiting on anything, so neither a sync that is
+            # still running nor a SIGKILL that follows (e.g. docker stop) leaves it shown as active
             self.stop()
+            
+            finished = True
+            if sync_thread is not None:
+                logger.info("Waiting for the running sync to finish (signal again to quit now)...")
+                finished = self._wait_for_sync(selector, wakeup_socket)
+        finally:
+            signal.set_wakeup_fd(-1)
+            selector.close()
+            wakeup_socket.close()
+            signal_socket.close()
+        
+        if finished:
+            self.close_sessions()
+        else:
+            # The sync thread is a daemon and dies with the process; the OS drops its sync lock
+            logger.info("Quitting without waiting for the sync")
+        logger.info("Background monitor stopped")
     
     def stop(self):
         """Stop the background monitoring process"""
         if not self.running:
             return
         
-        print("Stopping background monitor...")
+        logger.info("Stopping background monitor...")
         self.running = False
+        self._stop_event.set()
         
         # Update status to show background is inactive
         self.update_status()
+    
+    def close_sessions(self):
+        """Close the SMTP and Chrome sessions kept open between syncs"""
+        if self._email_sender is not None:
+            self._email_sender.close()
         
-        # Wait for sync thread to finish
-        if self.sync_thread and self.sync_thread.is_alive():
-            self.sync_thread.join(timeout=5)
-        
-        print("Background monitor stopped")
+        # Shut down the Chrome session the scraper kept running between syncs
+        if self._scraper is not None:
+            self._scraper.quit()
 
 def main():
     # Load environment variables
     load_dotenv()
+    listener = setup_logging()
     
     # Create and start the background monitor
-    monitor = BackgroundPhotoMonitor()
-    monitor.start()
+    try:
+        monitor = BackgroundPhotoMonitor()
+        monitor.start()
+    finally:
+        # Flush anything still queued before exiting
+        listener.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
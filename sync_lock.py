@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+# Who holds a SyncLock, recorded in the lock file by acquire()
+MANUAL = b'M'
+BACKGROUND = b'B'
+
+# Byte 0 is the one msvcrt locks, and Windows locks are mandatory, so the holder's kind
+# goes in the byte after it where other processes can still read it
+KIND_OFFSET = 1
+
+def _try_lock(fd):
+    """Take a non-blocking exclusive OS lock on fd, returning False if someone else holds it"""
+    try:
+        if sys.platform == 'win32':
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+def _unlock(fd):
+    if sys.platform == 'win32':
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+class SyncLock:
+    """
+    Cross-process mutex backed by an OS advisory lock (flock / msvcrt.locking) on a file.
+    The OS drops the lock when the holder exits, so a crash never leaves a stale lock behind.
+    The holder writes its kind (MANUAL or BACKGROUND) into the file, so whoever fails to
+    take the lock can tell which sync is running.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        # flock is per open file, so threads sharing this fd need their own guard
+        self._thread_lock = threading.Lock()
+        # Held only around each seek and the I/O after it, which share the fd's one offset
+        self._fd_lock = threading.Lock()
+    
+    def acquire(self, kind):
+        """Try to take the lock as kind; returns False immediately if it is already held"""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        with self._fd_lock:
+            if not _try_lock(self._fd):
+                self._thread_lock.release()
+                return False
+            os.lseek(self._fd, KIND_OFFSET, os.SEEK_SET)
+            os.write(self._fd, kind)
+        return True
+    
+    def holder(self):
+        """Kind recorded by the current (or, if none, the last) holder, or None if never taken"""
+        with self._fd_lock:
+            os.lseek(self._fd, KIND_OFFSET, os.SEEK_SET)
+            return os.read(self._fd, 1) or None
+    
+    def release(self):
+        with self._fd_lock:
+            _unlock(self._fd)
+        self._thread_lock.release()
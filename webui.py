@@ -1,95 +1,234 @@
 #!/usr/bin/env python3
 
 import os
-import json
 import threading
 import time
+import hashlib
+import heapq
+import gzip
+from collections import deque
+from itertools import chain
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from functools import lru_cache
 from datetime import datetime, timedelta
-from flask import Flask, render_template_string, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory
+from flask.json.provider import JSONProvider
+import orjson
+from waitress import serve
 from dotenv import load_dotenv
 from icloud_scraper import ICloudPhotoScraper
 from email_sender import EmailSender
+from sync_lock import SyncLock, BACKGROUND, MANUAL
+from atomic_file import atomic_write
 
 # Load environment variables
 load_dotenv()
 
+# Formatting is deferred to the logger, so messages below the configured level cost nothing
+logger = logging.getLogger('webui')
+
+@dataclass(frozen=True)
+class Config:
+    """Settings read from the environment once at startup; field names mirror the variables"""
+    icloud_album_url: str
+    photos_directory: str
+    smtp_server: str
+    smtp_port: int
+    smtp_username: str
+    smtp_password: str
+    to_email: str
+    
+    def missing(self):
+        """Names of the environment variables a sync needs that are not set"""
+        return [field.name.upper() for field in fields(self) if not getattr(self, field.name)]
+
 # Configuration
-ICLOUD_ALBUM_URL = os.getenv('ICLOUD_ALBUM_URL')
-PHOTOS_DIRECTORY = os.path.expanduser(os.getenv('PHOTOS_DIRECTORY', '~/Pictures/Skylight'))
+CONFIG = Config(
+    os.getenv('ICLOUD_ALBUM_URL'),
+    os.path.expanduser(os.getenv('PHOTOS_DIRECTORY', '~/Pictures/Skylight')),
+    os.getenv('SMTP_SERVER'),
+    int(os.getenv('SMTP_PORT', '587')),
+    os.getenv('SMTP_USERNAME'),
+    os.getenv('SMTP_PASSWORD'),
+    os.getenv('TO_EMAIL')
+)
+
+# Image files listed by /photos
+PHOTO_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif'})
+
+# Filenames of the newest photos, newest first, kept current by run_sync_once, and the
+# photos directory mtime they reflect; any other change to the directory (e.g. by the
+# background monitor, which is a separate process) makes /photos rescan it
+recent_photos = deque(maxlen=12)
+recent_photos_mtime = None
+recent_photos_lock = threading.Lock()
+
+def is_photo_name(name):
+    """Whether name ends in one of PHOTO_EXTENSIONS, with one slice and a set lookup"""
+    dot = name.rfind('.')
+    return dot >= 0 and name[dot:].lower() in PHOTO_EXTENSIONS
+
+def set_recent_photos(filenames, dir_mtime):
+    """Keep the latest photos by filename (newest first based on timestamp in filename); needs recent_photos_lock"""
+    global recent_photos_mtime
+    
+    newest = heapq.nlargest(recent_photos.maxlen, filenames)
+    recent_photos.clear()
+    recent_photos.extend(newest)
+    recent_photos_mtime = dir_mtime
+
+def photos_dir_mtime():
+    """mtime of the photos directory, or None if it doesn't exist yet"""
+    try:
+        return os.stat(CONFIG.photos_directory).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def add_recent_photos(paths, mtime_before):
+    """Merge photos a sync just downloaded into recent_photos, sparing /photos a rescan"""
+    dir_mtime = photos_dir_mtime()
+    with recent_photos_lock:
+        # Only if the listing was current before the sync; otherwise leave it to the rescan
+        if mtime_before is not None and mtime_before == recent_photos_mtime:
+            set_recent_photos(chain(recent_photos, map(os.path.basename, paths)), dir_mtime)
+    notify_state_changed()
 
-# Global variables for scheduler
-scheduler_active = False
-scheduler_interval = 3600  # Default: 1 hour
+# OS lock held while any sync runs, shared with the background monitor; released automatically if the process dies
+os.makedirs('data', exist_ok=True)
+SYNC_LOCK_FILE = os.path.join('data', 'sync.lock')
+sync_lock = SyncLock(SYNC_LOCK_FILE)
+
+# Single worker thread for syncs triggered from the web page, and the one it is running, if any
+sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sync')
+sync_future = None
+sync_future_lock = threading.Lock()
+
+# Scheduler settings, shared by the request handlers and the scheduler thread; only
+# read or written while holding scheduler_lock. last_sync is wall-clock time for display,
+# last_sync_monotonic the same moment on the clock the scheduler actually counts with
+scheduler_state = {'active': False, 'interval': 3600, 'last_sync': None, 'last_sync_monotonic': None}  # Default interval: 1 hour
+scheduler_lock = threading.Lock()
 scheduler_thread = None
-last_scheduled_sync = None
+# Set to wake the current scheduler thread immediately when it is stopped; each
+# thread gets a fresh event, so a stale thread can never be woken back into life
+scheduler_event = threading.Event()
+# Seconds before retrying a scheduled sync that failed, e.g. while the background monitor syncs
+SCHEDULER_RETRY_DELAY = 60
 
-def update_status(last_sync=None, last_error=None, photos_sent=None):
-    status_file = os.path.join('data', 'status.json')
-    status = {}
-    if os.path.exists(status_file):
-        with open(status_file, 'r') as f:
+# Parsed status.json, shared by the status endpoints and only re-read when the file changes
+STATUS_FILE = os.path.join('data', 'status.json')
+status_cache = {'data': {}, 'stamp': None}
+status_lock = threading.Lock()
+
+# Bumped and notified whenever something the control panel shows changes here, so /events
+# streams can push it at once. Changes made by the background monitor (another process)
+# are picked up when a stream's heartbeat timeout re-checks the state
+state_changed = threading.Condition()
+state_version = 0
+EVENTS_HEARTBEAT = 15  # seconds
+# Each open stream holds a waitress thread for as long as the page stays open, so cap them
+# well below WEBUI_THREADS; streams over the cap get a 503 and those pages poll /state instead
+EVENTS_MAX_STREAMS = 4
+events_slots = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+WEBUI_THREADS = 16
+
+def notify_state_changed():
+    """Wake every /events stream so it sends the new state"""
+    global state_version
+    
+    with state_changed:
+        state_version += 1
+        state_changed.notify_all()
+
+def load_status():
+    """Return a copy of status.json, re-parsing it only when its inode, mtime or size has changed"""
+    try:
+        st = os.stat(STATUS_FILE)
+    except FileNotFoundError:
+        return {}
+    # Every write swaps in a new file with os.replace, so the inode catches a write by the
+    # monitor that lands in the same mtime tick with the same size
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    with status_lock:
+        if stamp != status_cache['stamp']:
             try:
-                status = json.load(f)
-            except Exception:
-                status = {}
+                with open(STATUS_FILE, 'rb') as f:
+                    status_cache['data'] = orjson.loads(f.read())
+            except (FileNotFoundError, orjson.JSONDecodeError):
+                # Missing or corrupt; anything else (e.g. permissions) should surface
+                status_cache['data'] = {}
+            status_cache['stamp'] = stamp
+        return dict(status_cache['data'])
+
+def update_status(last_sync=None, last_error=None, photos_sent=None):
+    status = load_status()
+    previous = dict(status)
     if last_sync is not None:
         status['last_sync'] = last_sync
     if last_error is not None:
         status['last_error'] = last_error
     if photos_sent is not None:
         status['photos_sent'] = photos_sent
-    with open(status_file, 'w') as f:
-        json.dump(status, f, indent=2)
+    if status == previous:
+        return
+    
+    st = atomic_write(STATUS_FILE, orjson.dumps(status))
+    
+    # Seed the cache with what was just written so the next read doesn't parse it again
+    with status_lock:
+        status_cache['data'] = status
+        status_cache['stamp'] = (st.st_ino, st.st_mtime_ns, st.st_size)
+    notify_state_changed()
 
 def run_sync_once():
     """Run a single manual sync operation"""
-    global last_scheduled_sync
-    
-    if not ICLOUD_ALBUM_URL:
-        return False, "ICLOUD_ALBUM_URL not configured"
-    
-    # Create a lock file to prevent multiple instances
-    lock_file = os.path.join('data', 'scraper.lock')
-    background_lock_file = os.path.join('data', 'background_sync.lock')
-    
-    # Check if background sync is running
-    if os.path.exists(background_lock_file):
-        return False, "Background sync is running, please wait"
+    # Check every setting up front rather than failing halfway through a sync
+    missing = CONFIG.missing()
+    if missing:
+        return False, f"{', '.join(missing)} not configured"
     
-    # Check if another manual sync is running
-    if os.path.exists(lock_file):
+    # Take the sync lock, shared with the background monitor; if it is taken, the
+    # holder's kind says which sync is running
+    if not sync_lock.acquire(MANUAL):
+        if sync_lock.holder() == BACKGROUND:
+            return False, "Background sync is running, please wait"
         return False, "Another manual sync is already running"
     
+    # One timestamp for the whole sync, whether it succeeds or fails
+    last_sync = datetime.now().isoformat()
+    
     try:
-        # Create lock file
-        with open(lock_file, 'w') as f:
-            f.write(f"manual_sync_{os.getpid()}")
-        
-        last_sync = datetime.now().isoformat()
         photos_sent = 0
         last_error = None
         
-        # Initialize scraper with environment variable
-        print(f"Starting manual sync with album URL: {ICLOUD_ALBUM_URL}")
-        scraper = ICloudPhotoScraper(ICLOUD_ALBUM_URL, download_dir=PHOTOS_DIRECTORY)
+        # Initialize scraper with environment variable. Nothing here would ever quit a
+        # persistent Chrome session, and driver.json is shared with the background monitor,
+        # so each web UI sync starts its own browser and closes it when done
+        logger.info("Starting manual sync with album URL: %s", CONFIG.icloud_album_url)
+        scraper = ICloudPhotoScraper(CONFIG.icloud_album_url, download_dir=CONFIG.photos_directory, persist_driver=False)
         
         # Scrape new photos
-        print("Starting photo scraping...")
+        logger.info("Starting photo scraping...")
+        mtime_before = photos_dir_mtime()
         new_photos = scraper.scrape_photos()
-        print(f"Photo scraping completed. Found {len(new_photos)} new photos")
+        logger.info("Photo scraping completed. Found %d new photos", len(new_photos))
         
         if new_photos:
+            add_recent_photos(new_photos, mtime_before)
+            
             # Initialize email sender
             email_sender = EmailSender(
-                os.getenv('SMTP_SERVER'),
-                int(os.getenv('SMTP_PORT', '587')),
-                os.getenv('SMTP_USERNAME'),
-                os.getenv('SMTP_PASSWORD')
+                CONFIG.smtp_server,
+                CONFIG.smtp_port,
+                CONFIG.smtp_username,
+                CONFIG.smtp_password
             )
             
             # Send photos via email
             success = email_sender.send_photos_in_batches(
-                os.getenv('TO_EMAIL'), 
+                CONFIG.to_email, 
                 new_photos, 
                 batch_size=5
             )
@@ -100,65 +239,198 @@ def run_sync_once():
                 last_error = "Failed to send some or all photos"
         
         update_status(last_sync=last_sync, last_error=last_error, photos_sent=photos_sent)
-        last_scheduled_sync = datetime.now()
+        with scheduler_lock:
+            scheduler_state['last_sync'] = datetime.now()
+            scheduler_state['last_sync_monotonic'] = time.monotonic()
+        notify_state_changed()
         return True, f"Manual sync completed. Found {len(new_photos)} new photos, sent {photos_sent}"
         
     except Exception as e:
         error_msg = f"Manual sync error: {str(e)}"
-        update_status(last_sync=datetime.now().isoformat(), last_error=error_msg, photos_sent=0)
+        logger.error("Error during manual sync: %s", e)
+        update_status(last_sync=last_sync, last_error=error_msg, photos_sent=0)
         return False, error_msg
     finally:
-        # Clean up lock file
-        if os.path.exists(lock_file):
-            os.remove(lock_file)
+        sync_lock.release()
 
-def scheduler_worker():
-    """Background thread that runs scheduled syncs"""
-    global scheduler_active, scheduler_interval, last_scheduled_sync
-    
-    while scheduler_active:
+def scheduler_worker(stop_event):
+    """Background thread that runs scheduled syncs until stop_event is set"""
+    # A failed sync leaves last_sync where it was, so the next attempt waits at least until here
+    retry_at = 0
+    while not stop_event.is_set():
         try:
-            time.sleep(60)  # Check every minute
+            # Snapshot the schedule under the lock, then wait outside it. Counting on the
+            # monotonic clock keeps wall-clock jumps (NTP, DST) from skipping or bunching syncs
+            with scheduler_lock:
+                interval = scheduler_state['interval']
+                last_sync = scheduler_state['last_sync_monotonic']
+            if last_sync is not None:
+                timeout = max(0, last_sync + interval - time.monotonic())
+            else:
+                # First scheduled sync, or a retry after it failed, in a minute
+                timeout = 60
+            timeout = max(timeout, retry_at - time.monotonic())
             
-            if scheduler_active and last_scheduled_sync:
-                next_sync = last_scheduled_sync + timedelta(seconds=scheduler_interval)
-                if datetime.now() >= next_sync:
-                    print(f"[{datetime.now()}] Running scheduled sync...")
+            # Sleep until the sync is due; stop_scheduler() sets the event to wake us at once
+            if stop_event.wait(timeout):
+                break
+            
+            # A manual sync may have moved last_sync while we slept
+            with scheduler_lock:
+                interval = scheduler_state['interval']
+                last_sync = scheduler_state['last_sync_monotonic']
+            if last_sync is not None:
+                if time.monotonic() >= last_sync + interval:
+                    logger.info("Running scheduled sync...")
                     success, message = run_sync_once()
                     if success:
-                        print(f"[{datetime.now()}] Scheduled sync completed: {message}")
+                        logger.info("Scheduled sync completed: %s", message)
                     else:
-                        print(f"[{datetime.now()}] Scheduled sync failed: {message}")
-            elif scheduler_active and not last_scheduled_sync:
+                        logger.warning("Scheduled sync failed: %s", message)
+                        retry_at = time.monotonic() + SCHEDULER_RETRY_DELAY
+            else:
                 # First scheduled sync
-                print(f"[{datetime.now()}] Running first scheduled sync...")
+                logger.info("Running first scheduled sync...")
                 success, message = run_sync_once()
                 if success:
-                    print(f"[{datetime.now()}] First scheduled sync completed: {message}")
+                    logger.info("First scheduled sync completed: %s", message)
                 else:
-                    print(f"[{datetime.now()}] First scheduled sync failed: {message}")
+                    logger.warning("First scheduled sync failed: %s", message)
+                    retry_at = time.monotonic() + SCHEDULER_RETRY_DELAY
                     
         except Exception as e:
-            print(f"Scheduler error: {e}")
-            time.sleep(60)
+            logger.error("Scheduler error: %s", e)
+            stop_event.wait(SCHEDULER_RETRY_DELAY)
+
+@lru_cache(maxsize=128)
+def format_interval_seconds(seconds):
+    """Human readable interval such as '1h 30m'; only a handful of intervals are ever configured"""
+    hours, minutes = divmod(seconds // 60, 60)
+    return f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
+
+def file_etag(path):
+    """ETag for a file or directory from its inode, mtime and size, so it changes whenever it is rewritten"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 'missing'
+    return f"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+def not_modified(etag):
+    """A bodiless 304 if the client already has the response tagged etag, otherwise None"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+def json_with_etag(data, etag):
+    """jsonify data, tagged so the next poll can be answered with a 304"""
+    response = jsonify(data)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 def get_background_status():
     """Check if background process is running and get its status"""
-    status_file = os.path.join('data', 'status.json')
-    if os.path.exists(status_file):
-        try:
-            with open(status_file, 'r') as f:
-                status = json.load(f)
-                return status.get('background_active', False), status
-        except Exception:
-            pass
-    return False, {}
+    status = load_status()
+    return status.get('background_active', False), status
+
+def status_info():
+    """Last sync results for the status panel"""
+    status = load_status()
+    if status:
+        return status
+    
+    return {
+        'last_sync': None,
+        'last_error': None,
+        'photos_sent': 0
+    }
+
+def background_info():
+    """Whether the background monitor is running, and when it syncs next"""
+    background_active, status_data = get_background_status()
+    
+    next_sync = None
+    interval_text = "Unknown"
+    
+    if background_active and status_data:
+        # Get interval from status data
+        interval_minutes = status_data.get('sync_interval_minutes', 60)
+        interval_text = format_interval_seconds(interval_minutes * 60)
+        
+        # Get next sync time
+        next_sync = status_data.get('next_sync')
+        if next_sync:
+            next_sync = datetime.fromisoformat(next_sync).strftime('%Y-%m-%d %H:%M:%S')
+    
+    return {
+        'active': background_active,
+        'interval_text': interval_text,
+        'next_sync': next_sync
+    }
+
+def scheduler_info():
+    """Whether the web UI's own scheduler is running, and when it syncs next"""
+    with scheduler_lock:
+        active = scheduler_state['active']
+        interval = scheduler_state['interval']
+        last_sync = scheduler_state['last_sync']
+    
+    next_sync = None
+    if active and last_sync:
+        next_sync_time = last_sync + timedelta(seconds=interval)
+        next_sync = next_sync_time.strftime('%Y-%m-%d %H:%M:%S')
+    
+    return {
+        'active': active,
+        'interval': interval,
+        'interval_text': format_interval_seconds(interval),
+        'next_sync': next_sync
+    }
+
+def recent_photos_info(dir_mtime):
+    """The newest photos in the photos directory, given its current mtime"""
+    if dir_mtime is None:
+        return []
+    
+    # Adding or removing a file bumps the directory mtime; unless a sync here already
+    # accounted for it, rescan, which also seeds the listing on the first request
+    with recent_photos_lock:
+        if dir_mtime != recent_photos_mtime:
+            with os.scandir(CONFIG.photos_directory) as entries:
+                set_recent_photos((
+                    entry.name for entry in entries
+                    if is_photo_name(entry.name) and entry.is_file()
+                ), dir_mtime)
+        filenames = list(recent_photos)
+    
+    return [
+        {'filename': filename, 'path': os.path.join(CONFIG.photos_directory, filename)}
+        for filename in filenames
+    ]
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used by jsonify() and request.get_json()"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # orjson already produces bytes, so skip the round trip through str
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+# Behind nginx/Apache, let the proxy send /downloads files itself via the X-Sendfile header
+app.use_x_sendfile = os.getenv('X_SENDFILE') == '1'
 
-@app.route('/')
-def index():
-    return render_template_string('''
+# The control panel has no template variables, so it is encoded once at import and served as-is
+INDEX_HTML = '''
 <!DOCTYPE html>
 <html>
 <head>
@@ -238,7 +510,7 @@ def index():
         <div class="control-section">
             <h2>🔄 Manual Controls</h2>
             <button onclick="triggerSync()" id="sync-btn">🔄 Sync Now</button>
-            <button onclick="refreshStatus()">📊 Refresh Status</button>
+            <button onclick="refreshState()">📊 Refresh Status</button>
         </div>
         
         <div class="status-section">
@@ -251,54 +523,46 @@ def index():
         let schedulerActive = false;
         let backgroundActive = false;
         
-        function updateBackgroundStatus() {
-            fetch('/background/status')
-                .then(response => response.json())
-                .then(data => {
-                    backgroundActive = data.active;
-                    const statusElement = document.getElementById('background-status');
-                    const statusText = document.getElementById('background-status-text');
-                    
-                    if (data.active) {
-                        statusElement.className = 'scheduler-status scheduler-active';
-                        statusText.textContent = `Active (${data.interval_text})`;
-                        if (data.next_sync) {
-                            statusText.textContent += ` - Next sync: ${data.next_sync}`;
-                        }
-                        // Hide old scheduler section when background is active
-                        document.getElementById('scheduler-section-old').style.display = 'none';
-                    } else {
-                        statusElement.className = 'scheduler-status scheduler-inactive';
-                        statusText.textContent = 'Inactive - Run skylight_sync.py for background monitoring';
-                        // Show old scheduler section when background is inactive
-                        document.getElementById('scheduler-section-old').style.display = 'block';
-                    }
-                });
+        function renderBackgroundStatus(data) {
+            backgroundActive = data.active;
+            const statusElement = document.getElementById('background-status');
+            const statusText = document.getElementById('background-status-text');
+            
+            if (data.active) {
+                statusElement.className = 'scheduler-status scheduler-active';
+                statusText.textContent = `Active (${data.interval_text})`;
+                if (data.next_sync) {
+                    statusText.textContent += ` - Next sync: ${data.next_sync}`;
+                }
+                // Hide old scheduler section when background is active
+                document.getElementById('scheduler-section-old').style.display = 'none';
+            } else {
+                statusElement.className = 'scheduler-status scheduler-inactive';
+                statusText.textContent = 'Inactive - Run skylight_sync.py for background monitoring';
+                // Show old scheduler section when background is inactive
+                document.getElementById('scheduler-section-old').style.display = 'block';
+            }
         }
         
-        function updateSchedulerStatus() {
-            fetch('/scheduler/status')
-                .then(response => response.json())
-                .then(data => {
-                    schedulerActive = data.active;
-                    const statusElement = document.getElementById('scheduler-status');
-                    const statusText = document.getElementById('scheduler-status-text');
-                    
-                    if (data.active) {
-                        statusElement.className = 'scheduler-status scheduler-active';
-                        statusText.textContent = `Active (${data.interval_text})`;
-                        if (data.next_sync) {
-                            statusText.textContent += ` - Next sync: ${data.next_sync}`;
-                        }
-                        document.getElementById('start-scheduler').disabled = true;
-                        document.getElementById('stop-scheduler').disabled = false;
-                    } else {
-                        statusElement.className = 'scheduler-status scheduler-inactive';
-                        statusText.textContent = 'Inactive';
-                        document.getElementById('start-scheduler').disabled = false;
-                        document.getElementById('stop-scheduler').disabled = true;
-                    }
-                });
+        function renderSchedulerStatus(data) {
+            schedulerActive = data.active;
+            const statusElement = document.getElementById('scheduler-status');
+            const statusText = document.getElementById('scheduler-status-text');
+            
+            if (data.active) {
+                statusElement.className = 'scheduler-status scheduler-active';
+                statusText.textContent = `Active (${data.interval_text})`;
+                if (data.next_sync) {
+                    statusText.textContent += ` - Next sync: ${data.next_sync}`;
+                }
+                document.getElementById('start-scheduler').disabled = true;
+                document.getElementById('stop-scheduler').disabled = false;
+            } else {
+                statusElement.className = 'scheduler-status scheduler-inactive';
+                statusText.textContent = 'Inactive';
+                document.getElementById('start-scheduler').disabled = false;
+                document.getElementById('stop-scheduler').disabled = true;
+            }
         }
         
         function startScheduler() {
@@ -320,7 +584,7 @@ def index():
             .then(data => {
                 if (data.success) {
                     alert('Scheduler started successfully');
-                    updateSchedulerStatus();
+                    refreshState();
                 } else {
                     alert('Failed to start scheduler: ' + data.message);
                 }
@@ -333,7 +597,7 @@ def index():
                 .then(data => {
                     if (data.success) {
                         alert('Scheduler stopped');
-                        updateSchedulerStatus();
+                        refreshState();
                     } else {
                         alert('Failed to stop scheduler: ' + data.message);
                     }
@@ -349,112 +613,116 @@ def index():
                 .then(response => response.json())
                 .then(data => {
                     alert(data.message);
-                    refreshStatus();
+                    refreshState();
                     btn.disabled = false;
                     btn.textContent = '🔄 Sync Now';
                 });
         }
         
-        function refreshStatus() {
-            fetch('/status')
-                .then(response => response.json())
-                .then(data => {
-                    let html = '';
-                    html += '<div class="status-item"><span class="status-label">Last Sync:</span> <span class="status-value">' + (data.last_sync || 'Never') + '</span></div>';
-                    html += '<div class="status-item"><span class="status-label">Photos Sent:</span> <span class="status-value">' + (data.photos_sent || 0) + '</span></div>';
-                    if (data.last_error) {
-                        html += '<div class="status-item"><span class="status-label">Last Error:</span> <span class="status-value error">' + data.last_error + '</span></div>';
-                    } else {
-                        html += '<div class="status-item"><span class="status-label">Status:</span> <span class="status-value success">✅ All good</span></div>';
-                    }
-                    document.getElementById('status-content').innerHTML = html;
+        function renderStatus(data) {
+            let html = '';
+            html += '<div class="status-item"><span class="status-label">Last Sync:</span> <span class="status-value">' + (data.last_sync || 'Never') + '</span></div>';
+            html += '<div class="status-item"><span class="status-label">Photos Sent:</span> <span class="status-value">' + (data.photos_sent || 0) + '</span></div>';
+            if (data.last_error) {
+                html += '<div class="status-item"><span class="status-label">Last Error:</span> <span class="status-value error">' + data.last_error + '</span></div>';
+            } else {
+                html += '<div class="status-item"><span class="status-label">Status:</span> <span class="status-value success">✅ All good</span></div>';
+            }
+            document.getElementById('status-content').innerHTML = html;
+        }
+        
+        function renderPhotos(photos) {
+            let html = '';
+            if (photos && photos.length > 0) {
+                html = '<div class="photos-grid">';
+                photos.forEach(photo => {
+                    html += '<div class="photo-item">';
+                    html += '<img src="/downloads/' + photo.filename + '" alt="' + photo.filename + '">';
+                    html += '<p>' + photo.filename + '</p>';
+                    html += '</div>';
                 });
-            
-            fetch('/photos')
+                html += '</div>';
+            } else {
+                html = '<p>No photos available</p>';
+            }
+            document.getElementById('photos-content').innerHTML = html;
+        }
+        
+        function renderState(data) {
+            renderStatus(data.status);
+            renderPhotos(data.photos);
+            renderBackgroundStatus(data.background);
+            renderSchedulerStatus(data.scheduler);
+        }
+        
+        function refreshState() {
+            fetch('/state')
                 .then(response => response.json())
-                .then(data => {
-                    let html = '';
-                    if (data.photos && data.photos.length > 0) {
-                        html = '<div class="photos-grid">';
-                        data.photos.forEach(photo => {
-                            html += '<div class="photo-item">';
-                            html += '<img src="/downloads/' + photo.filename + '" alt="' + photo.filename + '">';
-                            html += '<p>' + photo.filename + '</p>';
-                            html += '</div>';
-                        });
-                        html += '</div>';
-                    } else {
-                        html = '<p>No photos available</p>';
-                    }
-                    document.getElementById('photos-content').innerHTML = html;
-                });
+                .then(renderState);
         }
         
-        // Auto-refresh every 10 seconds
-        setInterval(() => {
-            refreshStatus();
-            updateBackgroundStatus();
-            updateSchedulerStatus();
-        }, 10000);
+        // The server pushes the full state on connect and again whenever it changes;
+        // EventSource reconnects by itself if the connection drops. If streaming isn't
+        // available, or the server turned this one away (503), poll every 10 seconds instead
+        let polling = null;
+        function startPolling() {
+            if (polling === null) {
+                refreshState();
+                polling = setInterval(refreshState, 10000);
+            }
+        }
         
-        // Initial load
-        refreshStatus();
-        updateBackgroundStatus();
-        updateSchedulerStatus();
+        if (window.EventSource) {
+            const events = new EventSource('/events');
+            events.onmessage = e => renderState(JSON.parse(e.data));
+            events.onerror = () => {
+                if (events.readyState === EventSource.CLOSED) {
+                    startPolling();
+                }
+            };
+        } else {
+            startPolling();
+        }
     </script>
 </body>
 </html>
-    ''')
+    '''.encode()
+INDEX_ETAG = hashlib.blake2b(INDEX_HTML, digest_size=8).hexdigest()
+# Compressed once here too, for the browsers that accept it; a distinct ETag per encoding
+INDEX_HTML_GZIP = gzip.compress(INDEX_HTML, compresslevel=9, mtime=0)
+INDEX_ETAG_GZIP = INDEX_ETAG + '-gzip'
+
+@app.route('/')
+def index():
+    if request.accept_encodings['gzip']:
+        response = Response(INDEX_HTML_GZIP, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(INDEX_ETAG_GZIP)
+    else:
+        response = Response(INDEX_HTML, mimetype='text/html')
+        response.set_etag(INDEX_ETAG)
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request)
 
 @app.route('/background/status')
 def background_status():
-    background_active, status_data = get_background_status()
-    
-    next_sync = None
-    interval_text = "Unknown"
+    # Everything below comes from status.json, so its stamp tags the response; it is
+    # taken before the file is read, so a concurrent write can only make it look stale
+    etag = file_etag(STATUS_FILE)
+    response = not_modified(etag)
+    if response:
+        return response
     
-    if background_active and status_data:
-        # Get interval from status data
-        interval_minutes = status_data.get('sync_interval_minutes', 60)
-        hours = interval_minutes // 60
-        minutes = interval_minutes % 60
-        interval_text = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
-        
-        # Get next sync time
-        next_sync = status_data.get('next_sync')
-        if next_sync:
-            next_sync = datetime.fromisoformat(next_sync).strftime('%Y-%m-%d %H:%M:%S')
-    
-    return jsonify({
-        'active': background_active,
-        'interval_text': interval_text,
-        'next_sync': next_sync
-    })
+    return json_with_etag(background_info(), etag)
 
 @app.route('/scheduler/status')
 def scheduler_status():
-    global scheduler_active, scheduler_interval, last_scheduled_sync
-    
-    next_sync = None
-    if scheduler_active and last_scheduled_sync:
-        next_sync_time = last_scheduled_sync + timedelta(seconds=scheduler_interval)
-        next_sync = next_sync_time.strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Convert interval to human readable format
-    hours = scheduler_interval // 3600
-    minutes = (scheduler_interval % 3600) // 60
-    interval_text = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
-    
-    return jsonify({
-        'active': scheduler_active,
-        'interval': scheduler_interval,
-        'interval_text': interval_text,
-        'next_sync': next_sync
-    })
+    return jsonify(scheduler_info())
 
 @app.route('/scheduler/start', methods=['POST'])
 def start_scheduler():
-    global scheduler_active, scheduler_interval, scheduler_thread, last_scheduled_sync
+    global scheduler_thread, scheduler_event
     
     try:
         data = request.get_json()
@@ -463,19 +731,24 @@ def start_scheduler():
         if new_interval < 300:  # Minimum 5 minutes
             return jsonify({'success': False, 'message': 'Minimum interval is 5 minutes'})
         
-        # Stop existing scheduler if running
-        if scheduler_active:
-            scheduler_active = False
-            if scheduler_thread:
-                scheduler_thread.join(timeout=5)
-        
-        # Start new scheduler
-        scheduler_active = True
-        scheduler_interval = new_interval
-        last_scheduled_sync = None  # Reset to trigger immediate first sync
+        with scheduler_lock:
+            # Stop existing scheduler if running
+            old_thread = scheduler_thread
+            scheduler_event.set()
+            
+            # Start new scheduler
+            scheduler_state['active'] = True
+            scheduler_state['interval'] = new_interval
+            scheduler_state['last_sync'] = None  # Reset to trigger immediate first sync
+            scheduler_state['last_sync_monotonic'] = None
+            scheduler_event = threading.Event()
+            scheduler_thread = threading.Thread(target=scheduler_worker, args=(scheduler_event,), daemon=True)
+            scheduler_thread.start()
+        notify_state_changed()
         
-        scheduler_thread = threading.Thread(target=scheduler_worker, daemon=True)
-        scheduler_thread.start()
+        # Join outside the lock, since the old thread needs it to notice it was stopped
+        if old_thread:
+            old_thread.join(timeout=5)
         
         return jsonify({'success': True, 'message': 'Scheduler started'})
         
@@ -484,12 +757,14 @@ def start_scheduler():
 
 @app.route('/scheduler/stop', methods=['POST'])
 def stop_scheduler():
-    global scheduler_active, scheduler_thread
-    
     try:
-        scheduler_active = False
-        if scheduler_thread:
-            scheduler_thread.join(timeout=5)
+        with scheduler_lock:
+            scheduler_state['active'] = False
+            scheduler_event.set()
+            thread = scheduler_thread
+        notify_state_changed()
+        if thread:
+            thread.join(timeout=5)
         
         return jsonify({'success': True, 'message': 'Scheduler stopped'})
         
@@ -498,13 +773,19 @@ def stop_scheduler():
 
 @app.route('/sync', methods=['POST'])
 def manual_sync():
+    global sync_future
+    
     try:
-        # Run sync in a separate thread to avoid blocking the web request
-        def run_sync():
-            run_sync_once()
-        
-        sync_thread = threading.Thread(target=run_sync, daemon=True)
-        sync_thread.start()
+        # Run sync on the executor's thread to avoid blocking the web request; while one
+        # is still running, turn the request away instead of queueing another behind it
+        with sync_future_lock:
+            if sync_future is not None and not sync_future.done():
+                return jsonify({
+                    'message': 'A sync is already running',
+                    'status': 'busy',
+                    'time': datetime.now().isoformat()
+                }), 429
+            sync_future = sync_executor.submit(run_sync_once)
         
         return jsonify({
             'message': 'Manual sync triggered',
@@ -521,44 +802,91 @@ def manual_sync():
 
 @app.route('/status')
 def status():
-    status_file = os.path.join('data', 'status.json')
-    if os.path.exists(status_file):
-        with open(status_file, 'r') as f:
-            try:
-                return jsonify(json.load(f))
-            except Exception:
-                pass
+    etag = file_etag(STATUS_FILE)
+    response = not_modified(etag)
+    if response:
+        return response
     
-    return jsonify({
-        'last_sync': None,
-        'last_error': None,
-        'photos_sent': 0
-    })
+    return json_with_etag(status_info(), etag)
 
 @app.route('/photos')
 def photos():
-    photos_list = []
-    if os.path.exists(PHOTOS_DIRECTORY):
-        for filename in os.listdir(PHOTOS_DIRECTORY):
-            if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif')):
-                photos_list.append({
-                    'filename': filename,
-                    'path': os.path.join(PHOTOS_DIRECTORY, filename)
-                })
+    dir_mtime = photos_dir_mtime()
+    if dir_mtime is None:
+        return jsonify({'photos': []})
+    
+    # The listing only changes with the directory mtime, which doubles as the ETag
+    etag = f"{dir_mtime:x}"
+    response = not_modified(etag)
+    if response:
+        return response
+    
+    return json_with_etag({'photos': recent_photos_info(dir_mtime)}, etag)
+
+def state_body():
+    """Everything the control panel shows, as JSON bytes"""
+    return orjson.dumps({
+        'status': status_info(),
+        'photos': recent_photos_info(photos_dir_mtime()),
+        'background': background_info(),
+        'scheduler': scheduler_info()
+    })
+
+@app.route('/state')
+def state():
+    """The control panel's state in one response, for clients that poll"""
+    body = state_body()
+    response = Response(body, mimetype='application/json')
+    # Tagged by content, since the parts come from several sources that change independently
+    response.set_etag(hashlib.blake2b(body, digest_size=8).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/events')
+def events():
+    """Server-Sent Events stream that pushes the control panel's state whenever it changes"""
+    if not events_slots.acquire(blocking=False):
+        return Response('Too many event streams', status=503, mimetype='text/plain')
     
-    # Sort by filename (newest first based on timestamp in filename)
-    photos_list.sort(key=lambda x: x['filename'], reverse=True)
+    def stream():
+        version = None
+        last_body = None
+        while True:
+            with state_changed:
+                state_changed.wait_for(lambda: state_version != version, timeout=EVENTS_HEARTBEAT)
+                version = state_version
+            body = state_body()
+            if body != last_body:
+                last_body = body
+                yield b'data: ' + body + b'\n\n'
+            else:
+                # Comment line: keeps proxies from timing the stream out and lets a
+                # write fail, ending this generator, once the browser has gone away
+                yield b': heartbeat\n\n'
     
-    return jsonify({'photos': photos_list[:12]})  # Return latest 12 photos
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when waitress closes the response, even if the stream never started
+    response.call_on_close(events_slots.release)
+    return response
 
 @app.route('/downloads/<filename>')
 def download_file(filename):
-    return send_from_directory(PHOTOS_DIRECTORY, filename)
+    # Photos never change once downloaded, so let the browser keep them instead of
+    # refetching every thumbnail on each poll; conditional also answers 304s and ranges
+    return send_from_directory(CONFIG.photos_directory, filename, conditional=True, max_age=3600)
 
 if __name__ == '__main__':
     # Ensure data directory exists
     os.makedirs('data', exist_ok=True)
     
+    # Sync progress is logged at INFO; set LOG_LEVEL=INFO to see it
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'WARNING').upper(), format='[%(asctime)s] %(message)s')
+    
     print("Starting SkylightSync Web UI...")
     print("Access the control panel at: http://localhost:5003")
-    app.run(host='0.0.0.0', port=5003, debug=False) 
\ No newline at end of file
+    # Waitress keeps connections alive and serves the page's polls from a thread pool, rather
+    # than the Flask dev server. One process only: the scheduler and sync state live in memory
+    serve(app, host='0.0.0.0', port=5003, threads=WEBUI_THREADS, connection_limit=200) 
\ No newline at end of file